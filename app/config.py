@@ -50,6 +50,16 @@ class Config:
 
     RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.7"))
 
+    # Classifier models
+    MODEL_HOT_RELOAD = os.getenv("MODEL_HOT_RELOAD", "True").lower() == "true"
+    MODEL_RELOAD_CHECK_SECONDS = float(
+        os.getenv("MODEL_RELOAD_CHECK_SECONDS", "30")
+    )
+    # Excerpts per predict_proba call when classifying many documents at once
+    EXCERPT_CLASSIFIER_BATCH_SIZE = int(
+        os.getenv("EXCERPT_CLASSIFIER_BATCH_SIZE", "4096")
+    )
+
     SALT = os.getenv("AUTH_SALT") or local_config.get("AUTH_SALT")
     AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY") or local_config.get(
         "AUTH_SECRET_KEY"
@@ -78,6 +88,98 @@ class Config:
         "AZURE_STORAGE_ACCOUNT_KEY"
     ) or local_config.get("AZURE-STORAGE_ACCOUNT_KEY")
 
+    # Scan job queue
+    SCAN_WORKER_IN_PROCESS = (
+        os.getenv("SCAN_WORKER_IN_PROCESS", "True").lower() == "true"
+    )
+    SCAN_WORKER_CONCURRENCY = int(os.getenv("SCAN_WORKER_CONCURRENCY", "4"))
+    SCAN_LEASE_SECONDS = int(os.getenv("SCAN_LEASE_SECONDS", "120"))
+    SCAN_HEARTBEAT_SECONDS = int(os.getenv("SCAN_HEARTBEAT_SECONDS", "30"))
+    SCAN_POLL_SECONDS = float(os.getenv("SCAN_POLL_SECONDS", "2"))
+    SCAN_MAX_ATTEMPTS = int(os.getenv("SCAN_MAX_ATTEMPTS", "3"))
+    # Uploads are refused with a 503 once this many scans are queued, 0 to
+    # never refuse
+    SCAN_QUEUE_CEILING = int(os.getenv("SCAN_QUEUE_CEILING", "500"))
+    SCAN_QUEUE_RETRY_AFTER_SECONDS = int(
+        os.getenv("SCAN_QUEUE_RETRY_AFTER_SECONDS", "60")
+    )
+
+    # Concurrent OCR and LLM calls per process, and across all processes
+    # (0 disables the global limits)
+    OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "4"))
+    OCR_GLOBAL_MAX_CONCURRENCY = int(os.getenv("OCR_GLOBAL_MAX_CONCURRENCY", "0"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    LLM_GLOBAL_MAX_CONCURRENCY = int(os.getenv("LLM_GLOBAL_MAX_CONCURRENCY", "0"))
+
+    # LLM call resilience: client-side rate limits (0 for none), per-attempt
+    # timeout, retries and circuit breaker
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+    LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(
+        os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")
+    )
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+    # Statements longer than this many characters are extracted in chunks of
+    # pages, 0 to always extract them in one request
+    EXTRACTION_CHUNK_CHARS = int(os.getenv("EXTRACTION_CHUNK_CHARS", "0"))
+    # Persist and publish each account as soon as the LLM has written it
+    LLM_STREAMING_EXTRACTION = (
+        os.getenv("LLM_STREAMING_EXTRACTION", "True").lower() == "true"
+    )
+    # Output tokens assumed for a completion when estimating its token usage
+    LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "2000"))
+
+    # Seconds between Document Intelligence status polls
+    OCR_POLL_INTERVAL_SECONDS = float(os.getenv("OCR_POLL_INTERVAL_SECONDS", "1"))
+
+    # Page-parallel OCR, disabled when OCR_CHUNK_PAGES is 0
+    OCR_CHUNK_PAGES = int(os.getenv("OCR_CHUNK_PAGES", "0"))
+    OCR_CHUNK_CONCURRENCY = int(os.getenv("OCR_CHUNK_CONCURRENCY", "4"))
+
+    # Worker processes running the CPU-bound pipeline steps (PDF page
+    # filtering, excerpt classification), 0 to run them on a thread
+    CPU_POOL_WORKERS = int(
+        os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1)))
+    )
+
+    # Password hashing cost factor, and threads hashing concurrently
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_MAX_WORKERS = int(
+        os.getenv("BCRYPT_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+    )
+
+    # Authenticated identity cache, IDENTITY_CACHE_DIR enables the shared tier
+    IDENTITY_CACHE_TTL_SECONDS = int(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+    IDENTITY_CACHE_DIR = os.getenv("IDENTITY_CACHE_DIR", "")
+
+    # OCR result cache
+    OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "True").lower() == "true"
+    OCR_CACHE_DB_ENABLED = (
+        os.getenv("OCR_CACHE_DB_ENABLED", "True").lower() == "true"
+    )
+    OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", ".cache/ocr")
+    OCR_CACHE_DISK_SIZE_MB = int(os.getenv("OCR_CACHE_DISK_SIZE_MB", "1024"))
+    OCR_CACHE_TTL_SECONDS = int(
+        os.getenv("OCR_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60))
+    )
+    OCR_CACHE_MAX_DB_ENTRIES = int(os.getenv("OCR_CACHE_MAX_DB_ENTRIES", "10000"))
+
+    # LLM completion cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_DB_ENABLED = (
+        os.getenv("LLM_CACHE_DB_ENABLED", "True").lower() == "true"
+    )
+    LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".cache/llm")
+    LLM_CACHE_DISK_SIZE_MB = int(os.getenv("LLM_CACHE_DISK_SIZE_MB", "256"))
+    LLM_CACHE_TTL_SECONDS = int(
+        os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60))
+    )
+    LLM_CACHE_MAX_DB_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DB_ENTRIES", "10000"))
+
 
 app_config = Config()
 
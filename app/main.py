@@ -6,6 +6,7 @@ from sqlalchemy.exc import IntegrityError
 from pydantic import ValidationError
 import os
 import time
+import asyncio
 from app.routers import (
     auth,
     user,
@@ -17,11 +18,46 @@ from app.routers import (
     scan,
 )
 from app.models.database.orm_models import Base
-from app.utils.db_connection_manager import engine
+from app.utils.db_connection_manager import (
+    engine,
+    async_engine,
+    AsyncSessionLocal,
+)
+from app.models.database.scan_db import count_queued_scans
+from app.services.scan_worker import scan_worker_pool
+from app.services.scan_events import scan_status_broker
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_service import close_ocr_clients
+from app.services.llm_cache import llm_cache
+from app.services.model_registry import model_registry
+from app.services.identity_cache import identity_cache
+from app.services.stage_limiter import stage_limiter_stats
+from app.services.llm_resilience import llm_caller
+from app.services.cpu_pool import cpu_pool_stats, start_cpu_pool, stop_cpu_pool
+from app.utils.hash import hash_executor_stats
+from app.config import app_config
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 
-app = FastAPI(docs_url="/api/docs", openapi_url="/api/openapi.json")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await scan_status_broker.start()
+    if app_config.SCAN_WORKER_IN_PROCESS:
+        await asyncio.to_thread(model_registry.preload)
+        await start_cpu_pool()
+        await scan_worker_pool.start()
+    yield
+    await scan_worker_pool.stop()
+    await stop_cpu_pool()
+    await scan_status_broker.stop()
+    await close_ocr_clients()
+    await async_engine.dispose()
+
+
+app = FastAPI(
+    docs_url="/api/docs", openapi_url="/api/openapi.json", lifespan=lifespan
+)
 
 
 # Create database tables
@@ -52,6 +88,27 @@ async def health_check():
     return {"status": "healthy", "timestamp": int(time.time())}
 
 
+@api_router.get("/metrics")
+async def metrics():
+    return {
+        "ocr_cache": ocr_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "models": model_registry.stats(),
+        "identity_cache": identity_cache.stats(),
+        "password_hashing": hash_executor_stats(),
+        "scan_status_broker": scan_status_broker.stats(),
+        "scan_queue": {"depth": await _count_queued_scans()},
+        "stage_limiters": stage_limiter_stats(),
+        "llm_calls": llm_caller.stats(),
+        "cpu_pool": cpu_pool_stats(),
+    }
+
+
+async def _count_queued_scans() -> int:
+    async with AsyncSessionLocal() as db:
+        return await count_queued_scans(db)
+
+
 app.include_router(api_router)
 
 
@@ -78,6 +135,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=exc.headers,
     )
 
 
@@ -115,6 +173,7 @@ if os.getenv("NESTQ_ENV") != "production":
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
 
@@ -1,6 +1,9 @@
+import sys
+import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
 from collections import Counter
+from functools import cache
 
 KEYWORDS_DISCLAIMER_PAGE_DETECTION = [
     "disclaimer",
@@ -15,9 +18,16 @@ KEYWORDS_DISCLAIMER_PAGE_DETECTION = [
 
 KEYWORDS_NON_DISCLAIMER_PAGE_DETECTION = ["quantity", "price"]
 
+_DISCLAIMER_KEYWORDS = frozenset(KEYWORDS_DISCLAIMER_PAGE_DETECTION)
+_NON_DISCLAIMER_KEYWORDS = frozenset(KEYWORDS_NON_DISCLAIMER_PAGE_DETECTION)
+
+_ASCII_DIGITS = b"0123456789"
+
 
 def count_total_keyword_occurrences(words: list[str], keywords: list[str]) -> int:
-    return sum(word in keywords for word in words)
+    if not isinstance(keywords, (set, frozenset)):
+        keywords = frozenset(keywords)
+    return sum(map(keywords.__contains__, words))
 
 
 def count_keywords(words: list[str], keywords: list[str]) -> dict[str, int]:
@@ -25,17 +35,73 @@ def count_keywords(words: list[str], keywords: list[str]) -> dict[str, int]:
     return counter
 
 
+@cache
+def _unicode_digit_table() -> dict[int, None]:
+    """
+    Translate table deleting every character for which str.isdigit is true.
+    """
+    return {
+        codepoint: None
+        for codepoint in range(sys.maxunicode + 1)
+        if chr(codepoint).isdigit()
+    }
+
+
+def count_digits(text: str) -> int:
+    """
+    Count the characters of text for which str.isdigit is true.
+    """
+    if text.isascii():
+        return len(text) - len(text.encode("ascii").translate(None, _ASCII_DIGITS))
+    return len(text) - len(text.translate(_unicode_digit_table()))
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """
+    Element-wise division, 0 where the denominator is 0.
+    """
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros_like(numerator, dtype=np.float64),
+        where=denominator > 0,
+    )
+
+
 class FeatureExtractor(ABC):
+    """
+    Computes the features of every item of a document in one batch.
+
+    Raw counts are collected as items are added; the features of the whole
+    document are then derived from the counts with array operations.
+    """
+
+    feature_names: tuple[str, ...] = ()
+
     def __init__(self):
         self.items = []
         self.words = []
         self.word_count = []
+        self.counts = []
 
     def add(self, item):
-        self.items.append(item.strip())
+        text = item.strip()
         words = item.split()
+        self.items.append(text)
         self.words.append(words)
         self.word_count.append(len(words))
+        self.counts.append(self.count_item(text, words))
+
+    def extract_feature_matrix(self) -> np.ndarray:
+        """
+        Extracts features from all items added to the FeatureExtractor.
+
+        Returns:
+            np.ndarray: A (items, features) matrix, columns in feature_names order.
+        """
+        if not self.items:
+            return np.empty((0, len(self.feature_names)))
+        return self.compute_features(np.array(self.counts, dtype=np.float64))
 
     def extract_document_features(self) -> pd.DataFrame:
         """
@@ -44,15 +110,14 @@ class FeatureExtractor(ABC):
         Returns:
             pd.DataFrame: A DataFrame containing the extracted features.
         """
-        features = []
-        for index in range(len(self.items)):
-            features.append(self.extract_features(index))
-        return pd.DataFrame(features)
+        return pd.DataFrame(
+            self.extract_feature_matrix(), columns=list(self.feature_names)
+        )
 
-    @abstractmethod
     def extract_features(self, index: int) -> dict:
         """
-        Extracts features from a single item.
+        Extracts features from a single item. Prefer the document level
+        methods, this computes the features of every item.
 
         Args:
             index: The index of the item to extract features from.
@@ -60,88 +125,98 @@ class FeatureExtractor(ABC):
         Returns:
             dict: A dictionary containing the extracted features.
         """
-        pass
+        return dict(zip(self.feature_names, self.extract_feature_matrix()[index]))
 
-
-class ExcerptFeatureExtractor(FeatureExtractor):
-    def extract_features(self, index: int) -> dict:
+    @abstractmethod
+    def count_item(self, text: str, words: list[str]) -> tuple:
         """
-        Extracts features from a single excerpt.
+        Computes the raw counts of a single item.
 
         Args:
-            index: The index of the excerpt to extract features from.
+            text: The stripped item text.
+            words: The words of the item.
 
         Returns:
-            dict: A dictionary containing the extracted features.
+            tuple: The counts used by compute_features.
         """
-        # Implement excerpt-specific feature extraction here
-        text = self.items[index]
-        word_count = self.word_count[index]
-        words = self.words[index]
-        lines = text.split("\n")
-        new_line_count = text.count("\n")
-        pipe_line_count = sum(1 for line in lines if "|" in line)
-        avg_line_length = word_count / len(lines) if lines else word_count
-        digit_count = sum(char.isdigit() for char in text)
-        digit_ratio_by_line = digit_count / len(lines) if lines else 0
-
-        features = {
-            "new_line_count": new_line_count,
-            "pipe_line_ratio": pipe_line_count / new_line_count
-            if new_line_count > 0
-            else 0,
-            "avg_line_length": avg_line_length,
-            "digit_ratio_by_line": digit_ratio_by_line,
-        }
-        return features
-
+        pass
 
-class PageFeatureExtractor(FeatureExtractor):
-    def extract_features(self, index: int) -> dict:
+    @abstractmethod
+    def compute_features(self, counts: np.ndarray) -> np.ndarray:
         """
-        Extracts features from a single page.
+        Computes the features of every item from their raw counts.
 
         Args:
-            index: The index of the page to extract features from.
+            counts: A (items, counts) matrix of the count_item results.
 
         Returns:
-            dict: A dictionary containing the extracted features.
+            np.ndarray: A (items, features) matrix.
         """
-        page_text = self.items[index]
-        page_word_count = self.word_count[index]
-        words = self.words[index]
-        special_symbols = '"()'  # Define the special symbols we want to count
-        special_symbol_count = sum(
-            page_text.count(symbol) for symbol in special_symbols
-        )
-        features = {
-            "distance_from_start": index,
-            "distance_from_end": len(self.items) - index,
-            "page_word_count_ratio": page_word_count / sum(self.word_count),
-            "disclaimer_keyword_ratio": count_total_keyword_occurrences(
-                words, KEYWORDS_DISCLAIMER_PAGE_DETECTION
+        pass
+
+
+class ExcerptFeatureExtractor(FeatureExtractor):
+    feature_names = (
+        "new_line_count",
+        "pipe_line_ratio",
+        "avg_line_length",
+        "digit_ratio_by_line",
+    )
+
+    def count_item(self, text: str, words: list[str]) -> tuple:
+        lines = text.split("\n")
+        pipe_line_count = sum(1 for line in lines if "|" in line)
+        return (len(lines), pipe_line_count, count_digits(text), len(words))
+
+    def compute_features(self, counts: np.ndarray) -> np.ndarray:
+        line_count, pipe_line_count, digit_count, word_count = counts.T
+        new_line_count = line_count - 1
+        return np.column_stack(
+            (
+                new_line_count,
+                _safe_divide(pipe_line_count, new_line_count),
+                word_count / line_count,
+                digit_count / line_count,
             )
-            / page_word_count
-            if page_word_count > 0
-            else 0,
-            "non_disclaimer_keyword_ratio": count_total_keyword_occurrences(
-                words, KEYWORDS_NON_DISCLAIMER_PAGE_DETECTION
+        )
+
+
+class PageFeatureExtractor(FeatureExtractor):
+    feature_names = (
+        "distance_from_start",
+        "distance_from_end",
+        "page_word_count_ratio",
+        "disclaimer_keyword_ratio",
+        "non_disclaimer_keyword_ratio",
+        "digit_count_ratio",
+        "dollar_sign_ratio",
+        "special_symbol_ratio",
+    )
+
+    def count_item(self, text: str, words: list[str]) -> tuple:
+        # Special symbols counted: " ( )
+        special_symbol_count = text.count('"') + text.count("(") + text.count(")")
+        return (
+            len(words),
+            count_total_keyword_occurrences(words, _DISCLAIMER_KEYWORDS),
+            count_total_keyword_occurrences(words, _NON_DISCLAIMER_KEYWORDS),
+            count_digits(text),
+            text.count("$"),
+            special_symbol_count,
+        )
+
+    def compute_features(self, counts: np.ndarray) -> np.ndarray:
+        word_count = counts[:, 0]
+        distance_from_start = np.arange(len(counts), dtype=np.float64)
+        total_word_count = np.full_like(word_count, word_count.sum())
+        return np.column_stack(
+            (
+                distance_from_start,
+                len(counts) - distance_from_start,
+                _safe_divide(word_count, total_word_count),
+                _safe_divide(counts[:, 1:], word_count[:, np.newaxis]),
             )
-            / page_word_count
-            if page_word_count > 0
-            else 0,
-            "digit_count_ratio": sum(char.isdigit() for char in page_text)
-            / page_word_count
-            if page_word_count > 0
-            else 0,
-            "dollar_sign_ratio": page_text.count("$") / page_word_count
-            if page_word_count > 0
-            else 0,
-            "special_symbol_ratio": special_symbol_count / page_word_count
-            if page_word_count > 0
-            else 0,
-        }
-        return features
+        )
 
 
 if __name__ == "__main__":
@@ -1,7 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, distinct, func, insert, literal_column, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from fastapi import HTTPException, status
-from typing import List
+from typing import List, Optional
 from app.models.database.orm_models import Account, Holding, Scan
+from app.models.database.ownership_db import (
+    advisor_owns_prospect,
+    get_owned_account,
+    get_owned_scan,
+)
 from app.models.schemas.account_schema import (
     AccountUpdateSchema,
     AccountCreateSchema,
@@ -18,27 +26,87 @@ scan_not_found_exception = HTTPException(
 )
 
 
-def _get_account_or_raise(db: Session, account_id: int) -> Account:
-    account = db.query(Account).filter(Account.id == account_id).first()
+def scan_aggregate_values(scan_id: int) -> dict:
+    """
+    Values of the aggregate columns of a scan, recomputed from its accounts
+    and holdings, to be used in an UPDATE of the scan. Must be applied
+    whenever the accounts or holdings of a scan change.
+    """
+    scan_accounts = Account.scan_id == scan_id
+    institutions = func.string_agg(
+        distinct(Account.institution),
+        aggregate_order_by(literal_column("', '"), Account.institution),
+    )
+    return {
+        "total_value": select(func.coalesce(func.sum(Account.account_value), 0.0))
+        .where(scan_accounts)
+        .scalar_subquery(),
+        "institutions": select(func.coalesce(institutions, ""))
+        .where(scan_accounts, Account.institution != "")
+        .scalar_subquery(),
+        "account_count": select(func.count(Account.id))
+        .where(scan_accounts)
+        .scalar_subquery(),
+        "holding_count": select(func.count(Holding.id))
+        .join(Account, Holding.account_id == Account.id)
+        .where(scan_accounts)
+        .scalar_subquery(),
+    }
+
+
+def refresh_scan_aggregates(db: Session, scan_id: Optional[int]) -> None:
+    if scan_id is not None:
+        db.execute(
+            update(Scan)
+            .where(Scan.id == scan_id)
+            .values(**scan_aggregate_values(scan_id))
+        )
+
+
+async def _get_account_or_raise(db: AsyncSession, account_id: int) -> Account:
+    account = await db.get(Account, account_id)
     if not account:
         raise account_not_found_exception
     return account
 
 
-def is_advisor_scan(db: Session, advisor_id: int, scan_id: int) -> bool:
-    scan = db.query(Scan).filter(Scan.id == scan_id).first()
+async def is_advisor_scan(db: AsyncSession, advisor_id: int, scan_id: int) -> bool:
+    scan, is_owner = await get_owned_scan(db, advisor_id, scan_id)
     if not scan:
         raise scan_not_found_exception
-    return scan.prospect.advisor.id == advisor_id
+    return is_owner
+
+
+async def is_advisor_account(
+    db: AsyncSession, advisor_id: int, account_id: int
+) -> bool:
+    account, is_owner = await get_owned_account(db, advisor_id, account_id)
+    if not account:
+        raise account_not_found_exception
+    return is_owner
+
 
+async def is_advisor_prospect(
+    db: AsyncSession, advisor_id: int, prospect_id: int
+) -> bool:
+    return await advisor_owns_prospect(db, advisor_id, prospect_id)
 
-def is_advisor_account(db: Session, advisor_id: int, account_id: int) -> bool:
-    account = _get_account_or_raise(db, account_id)
-    return account.scan.prospect.advisor.id == advisor_id
+
+async def get_accounts_by_prospect(
+    db: AsyncSession, prospect_id: int
+) -> List[Account]:
+    accounts = await db.scalars(
+        select(Account)
+        .join(Account.scan)
+        .filter(Scan.prospect_id == prospect_id)
+    )
+    return accounts.all()
 
 
-def get_accounts_by_scan(db: Session, scan_id: int) -> List[Account]:
-    accounts = db.query(Account).filter(Account.scan_id == scan_id).all()
+async def get_accounts_by_scan(db: AsyncSession, scan_id: int) -> List[Account]:
+    accounts = (
+        await db.scalars(select(Account).filter(Account.scan_id == scan_id))
+    ).all()
     if not accounts:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -47,46 +115,70 @@ def get_accounts_by_scan(db: Session, scan_id: int) -> List[Account]:
     return accounts
 
 
-def get_account_by_id(db: Session, account_id: int) -> Account:
-    account = _get_account_or_raise(db, account_id)
-    # Explicitly load the holdings
-    account.holdings = (
-        db.query(Holding).filter(Holding.account_id == account_id).all()
+async def get_account_by_id(db: AsyncSession, account_id: int) -> Account:
+    # Load the holdings with the account
+    account = await db.scalar(
+        select(Account)
+        .filter(Account.id == account_id)
+        .options(selectinload(Account.holdings))
     )
+    if not account:
+        raise account_not_found_exception
     return account
 
 
-def update_account(
-    db: Session, account_id: int, account_update: AccountUpdateSchema
+async def update_account(
+    db: AsyncSession, account: Account, account_update: AccountUpdateSchema
 ) -> Account:
-    account = _get_account_or_raise(db, account_id)
     for field, value in account_update.dict(exclude_unset=True).items():
         setattr(account, field, value)
-    db.commit()
-    db.refresh(account)
+    if account.scan_id is not None:
+        # The session doesn't autoflush, the aggregates must see the new values
+        await db.flush()
+        await db.execute(
+            update(Scan)
+            .where(Scan.id == account.scan_id)
+            .values(**scan_aggregate_values(account.scan_id))
+        )
+    await db.commit()
     return account
 
 
-def create_account(
-    db: Session, account_create: AccountCreateSchema, scan_id: int
-) -> Account:
-    scan = db.query(Scan).filter(Scan.id == scan_id).first()
-    if not scan:
-        raise scan_not_found_exception
+def delete_scan_accounts(db: Session, scan_id: int) -> None:
+    """
+    Delete the accounts of a scan and their holdings, without committing.
+    """
+    scan_account_ids = select(Account.id).where(Account.scan_id == scan_id)
+    db.execute(delete(Holding).where(Holding.account_id.in_(scan_account_ids)))
+    db.execute(delete(Account).where(Account.scan_id == scan_id))
 
-    # Create the account
-    account_data = account_create.model_dump(exclude={"id", "holdings"})
-    db_account = Account(**account_data, scan_id=scan_id)
-    db.add(db_account)
-    db.flush()  # This assigns an ID to db_account without committing the transaction
 
-    # Create holdings
-    for holding_data in account_create.holdings:
-        db_holding = Holding(
-            **holding_data.model_dump(exclude={"id"}), account_id=db_account.id
-        )
-        db.add(db_holding)
-    db.commit()
-    db.refresh(db_account)
+def bulk_create_accounts(
+    db: Session, accounts: List[AccountCreateSchema], scan_id: int
+) -> List[int]:
+    """
+    Insert the accounts of a scan and all of their holdings with one
+    statement each, without committing.
 
-    return db_account
+    Returns:
+        List[int]: The ids of the created accounts, in the order of accounts
+    """
+    if not accounts:
+        return []
+
+    account_ids = db.scalars(
+        insert(Account).returning(Account.id, sort_by_parameter_order=True),
+        [
+            {**account.model_dump(exclude={"id", "holdings"}), "scan_id": scan_id}
+            for account in accounts
+        ],
+    ).all()
+
+    holdings = [
+        {**holding.model_dump(exclude={"id"}), "account_id": account_id}
+        for account_id, account in zip(account_ids, accounts)
+        for holding in account.holdings
+    ]
+    if holdings:
+        db.execute(insert(Holding), holdings)
+    return account_ids
@@ -9,6 +9,7 @@ from app.models.schemas.advisor_schema import (
     AdvisorDetailDisplaySchema,
     AdvisorDisplaySchema,
 )
+from app.services.identity_cache import identity_cache
 
 advisor_not_found_exception = HTTPException(
     status_code=status.HTTP_404_NOT_FOUND,
@@ -83,5 +84,8 @@ def delete_advisor(db: Session, advisor_id: int):
     """
     # Use the helper function
     advisor = _get_advisor_or_raise(db, advisor_id)
+    user_id = advisor.user_id
     db.delete(advisor)
     db.commit()
+    # The user's cached identity still holds the advisor
+    identity_cache.invalidate(user_id)
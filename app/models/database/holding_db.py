@@ -1,19 +1,31 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.models.database.orm_models import Holding
+from app.models.database.account_db import refresh_scan_aggregates
+from app.models.database.orm_models import Holding, Prospect, Scan
 from app.models.schemas.holding_schema import (
     HoldingCreateSchema,
     HoldingUpdateSchema,
 )
 from app.models.schemas.user_schema import UserBaseSchema
-from app.models.database.prospect_db import get_prospect
-from app.models.database.scan_db import get_scan
+
+
+def _get_prospect(db: Session, prospect_id: int) -> Prospect:
+    return db.get(Prospect, prospect_id)
+
+
+def _get_scan(db: Session, scan_id: int) -> Scan:
+    return db.get(Scan, scan_id)
+
+
+def _get_holding_scan_id(holding: Holding) -> Optional[int]:
+    return holding.account.scan_id if holding.account is not None else None
 
 
 def create_holding(
     db: Session, holding: HoldingCreateSchema, current_user: UserBaseSchema
 ):
-    prospect = get_prospect(db, holding.prospect_id)
+    prospect = _get_prospect(db, holding.prospect_id)
     if prospect.advisor_id != current_user.id:
         raise HTTPException(
             status_code=403,
@@ -22,6 +34,8 @@ def create_holding(
 
     db_holding = Holding(**holding.dict())
     db.add(db_holding)
+    db.flush()
+    refresh_scan_aggregates(db, _get_holding_scan_id(db_holding))
     db.commit()
     db.refresh(db_holding)
     return db_holding
@@ -32,7 +46,7 @@ def get_holding_by_id(db: Session, holding_id: int, current_user: UserBaseSchema
     if not holding:
         raise HTTPException(status_code=404, detail="Holding not found")
 
-    prospect = get_prospect(db, holding.prospect_id)
+    prospect = _get_prospect(db, holding.prospect_id)
     if prospect.advisor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
@@ -50,6 +64,9 @@ def update_holding(
     for key, value in holding.dict(exclude_unset=True).items():
         setattr(db_holding, key, value)
 
+    # The session doesn't autoflush, the aggregates must see the new values
+    db.flush()
+    refresh_scan_aggregates(db, _get_holding_scan_id(db_holding))
     db.commit()
     db.refresh(db_holding)
     return db_holding
@@ -57,12 +74,15 @@ def update_holding(
 
 def delete_holding(db: Session, holding_id: int, current_user: UserBaseSchema):
     db_holding = get_holding_by_id(db, holding_id, current_user)
+    scan_id = _get_holding_scan_id(db_holding)
     db.delete(db_holding)
+    db.flush()
+    refresh_scan_aggregates(db, scan_id)
     db.commit()
 
 
 def get_holdings_by_scan(db: Session, scan_id: int, current_user: UserBaseSchema):
-    scan = get_scan(db, scan_id)
+    scan = _get_scan(db, scan_id)
     if scan.advisor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
@@ -72,7 +92,7 @@ def get_holdings_by_scan(db: Session, scan_id: int, current_user: UserBaseSchema
 def get_holdings_by_prospect(
     db: Session, prospect_id: int, current_user: UserBaseSchema
 ):
-    prospect = get_prospect(db, prospect_id)
+    prospect = _get_prospect(db, prospect_id)
     if prospect.advisor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
@@ -0,0 +1,91 @@
+"""
+OCR text of the scans, stored zlib-compressed in the ocr_texts table.
+
+The markdown of a statement can run to hundreds of KB; it's only read by the
+/scans/{scan_id}/ocr endpoint, never with the scan itself.
+"""
+
+import zlib
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.database.orm_models import OcrText
+from app.models.schemas.scan_schema import OcrTextSchema
+
+
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    return zlib.compress(text.encode("utf-8")) if text is not None else None
+
+
+def decompress_text(payload: Optional[bytes]) -> Optional[str]:
+    return zlib.decompress(payload).decode("utf-8") if payload is not None else None
+
+
+def _size_bytes(*texts: Optional[str]) -> int:
+    return sum(len((text or "").encode("utf-8")) for text in texts)
+
+
+def create_ocr_text(db: Session, ocr_text: OcrTextSchema) -> OcrText:
+    """
+    Add the compressed text of a scan to the session, without committing.
+    """
+    db_ocr_text = OcrText(
+        scan_id=ocr_text.scan_id,
+        ocr_text=compress_text(ocr_text.ocr_text),
+        ocr_text_cleaned=compress_text(ocr_text.ocr_text_cleaned),
+        size_bytes=_size_bytes(ocr_text.ocr_text, ocr_text.ocr_text_cleaned),
+    )
+    db.add(db_ocr_text)
+    return db_ocr_text
+
+
+async def get_ocr_text(db: AsyncSession, scan_id: int) -> Optional[OcrTextSchema]:
+    db_ocr_text = await db.get(OcrText, scan_id)
+    if db_ocr_text is None:
+        return None
+    return OcrTextSchema(
+        scan_id=scan_id,
+        ocr_text=decompress_text(db_ocr_text.ocr_text),
+        ocr_text_cleaned=decompress_text(db_ocr_text.ocr_text_cleaned),
+    )
+
+
+def get_ocr_texts_after(
+    db: Session, after_scan_id: int, limit: int
+) -> List[Tuple[int, str]]:
+    """
+    The (scan_id, ocr_text) of the first limit scans with an OCR text after
+    after_scan_id, in scan_id order.
+    """
+    rows = db.execute(
+        select(OcrText.scan_id, OcrText.ocr_text)
+        .where(OcrText.scan_id > after_scan_id, OcrText.ocr_text.is_not(None))
+        .order_by(OcrText.scan_id)
+        .limit(limit)
+    ).all()
+    return [(scan_id, decompress_text(payload)) for scan_id, payload in rows]
+
+
+def update_ocr_texts_cleaned(
+    db: Session, texts: List[Tuple[int, str, str]]
+) -> None:
+    """
+    Replace the cleaned text of the (scan_id, ocr_text, ocr_text_cleaned)
+    scans, without committing.
+    """
+    if not texts:
+        return
+    db.execute(
+        update(OcrText),
+        [
+            {
+                "scan_id": scan_id,
+                "ocr_text_cleaned": compress_text(cleaned_text),
+                "size_bytes": _size_bytes(text, cleaned_text),
+            }
+            for scan_id, text, cleaned_text in texts
+        ],
+    )
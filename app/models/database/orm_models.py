@@ -315,9 +315,22 @@ class Scan(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     prospect_id = Column(Integer, ForeignKey("prospects.id"), nullable=True)
+    # Advisor of the prospect, copied so an advisor's scans can be listed
+    # from one index. Prospects never change advisor.
+    advisor_id = Column(Integer, ForeignKey("advisors.id"), nullable=True)
     file_name = Column(String(255), nullable=False)
     blob_name = Column(String(255), nullable=False)
     status = Column(Enum(ScanStatus), nullable=False)
+    # Job queue bookkeeping, see app/services/scan_worker.py
+    attempts = Column(Integer, default=0, nullable=False)
+    worker_id = Column(String(100), nullable=True)
+    heartbeat_at = Column(BigInteger, nullable=True)
+    lease_expires_at = Column(BigInteger, nullable=True)
+    # Account aggregates, see account_db.scan_aggregate_values
+    total_value = Column(Float, default=0.0, server_default="0", nullable=False)
+    institutions = Column(Text, default="", server_default="", nullable=False)
+    account_count = Column(Integer, default=0, server_default="0", nullable=False)
+    holding_count = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(BigInteger, default=utc_timestamp, nullable=False)
     updated_at = Column(
         BigInteger, default=utc_timestamp, onupdate=utc_timestamp, nullable=False
@@ -332,10 +345,19 @@ class Scan(Base):
         uselist=False,
         cascade="all, delete-orphan",
     )
+    ocr_text = relationship(
+        "OcrText",
+        back_populates="scan",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
     accounts = relationship("Account", back_populates="scan")
     __table_args__ = (
         Index("ix_scans_prospect_id", "prospect_id"),
         Index("ix_scans_status", "status"),
+        Index("ix_scans_status_lease_expires_at", "status", "lease_expires_at"),
+        Index("ix_scans_advisor_id_created_at_id", "advisor_id", "created_at", "id"),
     )
 
     @property
@@ -346,6 +368,14 @@ class Scan(Base):
     def statement_date(self, value: Optional[int]):
         self._statement_date = value
 
+    @property
+    def amount(self) -> float:
+        return self.total_value
+
+    @property
+    def institution(self) -> str:
+        return self.institutions
+
     def __repr__(self):
         return f"""<Scan(id={self.id}, prospect_id={self.prospect_id}, status={self.status})>"""
 
@@ -437,8 +467,6 @@ class OcrResult(Base):
     ocr_source = Column(String(50), nullable=True)
     llm_source = Column(String(50), nullable=True)
     error_message = Column(String(255), nullable=True)
-    ocr_text = Column(Text, nullable=True)
-    ocr_text_cleaned = Column(Text, nullable=True)
     processing_time = Column(Float, nullable=True)
     page_count = Column(Integer, nullable=True)
     statement_date = Column(BigInteger, nullable=True)
@@ -455,6 +483,54 @@ class OcrResult(Base):
         return f"<OcrResult(id={self.id}, scan_id={self.scan_id})>"
 
 
+class OcrText(Base):
+    """
+    Markdown text of a scan, zlib-compressed and kept out of ocr_results so
+    the scan queries never read it. See app/models/database/ocr_text_db.py.
+    """
+
+    __tablename__ = "ocr_texts"
+
+    scan_id = Column(
+        Integer, ForeignKey("scans.id", ondelete="CASCADE"), primary_key=True
+    )
+    ocr_text = Column(LargeBinary, nullable=True)
+    ocr_text_cleaned = Column(LargeBinary, nullable=True)
+    # Uncompressed size of both texts
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(BigInteger, default=utc_timestamp, nullable=False)
+
+    scan = relationship("Scan", back_populates="ocr_text")
+
+    def __repr__(self):
+        return f"<OcrText(scan_id={self.scan_id}, size_bytes={self.size_bytes})>"
+
+
+class CachedResult(Base):
+    """
+    Content-addressed cache of expensive processing results (OCR, LLM).
+    """
+
+    __tablename__ = "result_cache"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    namespace = Column(String(100), nullable=False)
+    key = Column(String(64), nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(BigInteger, default=utc_timestamp, nullable=False)
+    last_accessed_at = Column(BigInteger, default=utc_timestamp, nullable=False)
+
+    __table_args__ = (
+        Index("ix_result_cache_namespace_key", "namespace", "key", unique=True),
+        Index("ix_result_cache_last_accessed_at", "last_accessed_at"),
+    )
+
+    def __repr__(self):
+        return f"<CachedResult(namespace='{self.namespace}', key='{self.key}')>"
+
+
 # Create tables in the database
 if __name__ == "__main__":
     from app.utils.db_connection_manager import engine
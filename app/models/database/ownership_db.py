@@ -0,0 +1,121 @@
+"""
+Ownership predicates resolving an object and whether an advisor owns it in a
+single query.
+
+Each getter joins the object to its prospect and selects the ownership test
+next to the object, so authorizing a request costs one round trip. Loader
+options (e.g. selectinload) can be passed to load what the route returns in
+the same call.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from app.models.database.orm_models import Account, Prospect, Scan
+
+
+async def _get_owned(db: AsyncSession, stmt) -> Tuple[Optional[object], bool]:
+    row = (await db.execute(stmt)).unique().first()
+    if row is None:
+        return None, False
+    obj, is_owner = row
+    return obj, bool(is_owner)
+
+
+async def get_owned_prospect(
+    db: AsyncSession,
+    advisor_id: int,
+    prospect_id: int,
+    options: Sequence[LoaderOption] = (),
+) -> Tuple[Optional[Prospect], bool]:
+    """
+    Returns:
+        (prospect, is_owner): prospect is None if it doesn't exist
+    """
+    stmt = (
+        select(Prospect, Prospect.advisor_id == advisor_id)
+        .filter(Prospect.id == prospect_id)
+        .options(*options)
+    )
+    return await _get_owned(db, stmt)
+
+
+async def get_owned_scan(
+    db: AsyncSession,
+    advisor_id: int,
+    scan_id: int,
+    options: Sequence[LoaderOption] = (),
+) -> Tuple[Optional[Scan], bool]:
+    """
+    Returns:
+        (scan, is_owner): scan is None if it doesn't exist
+    """
+    stmt = (
+        select(Scan, Prospect.advisor_id == advisor_id)
+        .outerjoin(Prospect, Scan.prospect_id == Prospect.id)
+        .filter(Scan.id == scan_id)
+        .options(*options)
+    )
+    return await _get_owned(db, stmt)
+
+
+async def get_owned_account(
+    db: AsyncSession,
+    advisor_id: int,
+    account_id: int,
+    options: Sequence[LoaderOption] = (),
+) -> Tuple[Optional[Account], bool]:
+    """
+    Returns:
+        (account, is_owner): account is None if it doesn't exist
+    """
+    stmt = (
+        select(Account, Prospect.advisor_id == advisor_id)
+        .outerjoin(Scan, Account.scan_id == Scan.id)
+        .outerjoin(Prospect, Scan.prospect_id == Prospect.id)
+        .filter(Account.id == account_id)
+        .options(*options)
+    )
+    return await _get_owned(db, stmt)
+
+
+async def advisor_owns_prospect(
+    db: AsyncSession, advisor_id: int, prospect_id: int
+) -> bool:
+    return await db.scalar(
+        select(
+            exists().where(
+                Prospect.id == prospect_id, Prospect.advisor_id == advisor_id
+            )
+        )
+    )
+
+
+async def advisor_owns_scan(db: AsyncSession, advisor_id: int, scan_id: int) -> bool:
+    return await db.scalar(
+        select(
+            exists().where(
+                Scan.id == scan_id,
+                Scan.prospect_id == Prospect.id,
+                Prospect.advisor_id == advisor_id,
+            )
+        )
+    )
+
+
+async def advisor_owns_account(
+    db: AsyncSession, advisor_id: int, account_id: int
+) -> bool:
+    return await db.scalar(
+        select(
+            exists().where(
+                Account.id == account_id,
+                Account.scan_id == Scan.id,
+                Scan.prospect_id == Prospect.id,
+                Prospect.advisor_id == advisor_id,
+            )
+        )
+    )
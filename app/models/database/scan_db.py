@@ -1,107 +1,208 @@
+import asyncio
+import base64
+import binascii
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.database.orm_models import Advisor, Prospect, Scan
+from app.models.database.orm_models import (
+    Account,
+    Advisor,
+    Prospect,
+    Scan,
+    utc_timestamp,
+)
 from app.models.schemas.scan_schema import (
     ScanCreateSchema,
     ScanProcessorUpdateSchema,
     OcrResultSchema,
+    OcrTextSchema,
+    ScanListItemSchema,
 )
+from app.models.schemas.extraction_schema import ScanExtractedDataSchema
+from app.models.schemas.account_schema import AccountCreateSchema
+from app.config import app_config
 from app.utils.db_connection_manager import SessionLocal
 from app.services.statement_extractor import FinancialStatementProcessor
-from app.models.database.account_db import create_account
+from app.models.database.account_db import (
+    bulk_create_accounts,
+    delete_scan_accounts,
+    refresh_scan_aggregates,
+    scan_aggregate_values,
+)
+from app.models.database.ocr_text_db import create_ocr_text
 from app.models.database.orm_models import OcrResult
-from sqlalchemy import select
-from sqlalchemy.orm import contains_eager
+from app.models.enums import ScanStatus
+from app.services.scan_events import publish_scan_status, apublish_scan_status
+from sqlalchemy import func, select, tuple_, update, or_, and_
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional, Tuple
+
+# Relationships rendered by ScanDisplayDetailSchema
+SCAN_DETAIL_LOAD_OPTIONS = (
+    joinedload(Scan.ocr_result),
+    selectinload(Scan.prospect),
+    selectinload(Scan.accounts).selectinload(Account.holdings),
+)
 
 
-def create_scan(db: Session, scan: ScanCreateSchema) -> Scan:
-    db_scan = Scan(**scan.dict())
+async def create_scan(db: AsyncSession, scan: ScanCreateSchema) -> Scan:
+    db_scan = Scan(
+        **scan.dict(),
+        advisor_id=select(Prospect.advisor_id)
+        .filter(Prospect.id == scan.prospect_id)
+        .scalar_subquery(),
+    )
     db.add(db_scan)
-    db.commit()
+    await db.commit()
 
-    db.refresh(db_scan)
+    await db.refresh(db_scan, ["prospect"])
     return db_scan
 
 
-def get_scan(db: Session, scan_id: int) -> Scan:
-    return db.query(Scan).filter(Scan.id == scan_id).first()
+async def get_scan(db: AsyncSession, scan_id: int) -> Optional[Scan]:
+    return await db.get(Scan, scan_id)
+
+
+async def read_scan_status(db: AsyncSession, scan_id: int) -> Optional[ScanStatus]:
+    return await db.scalar(select(Scan.status).filter(Scan.id == scan_id))
+
+
+async def count_queued_scans(db: AsyncSession) -> int:
+    """
+    Number of scans waiting for a worker.
+    """
+    return await db.scalar(
+        select(func.count(Scan.id)).filter(Scan.status == ScanStatus.UPLOADED)
+    )
 
 
-def get_scan_with_ocr_result(db: Session, scan_id: int) -> Scan:
+async def get_scan_with_ocr_result(db: AsyncSession, scan_id: int) -> Scan:
     stmt = (
-        select(Scan)
-        .outerjoin(Scan.ocr_result)
-        .options(contains_eager(Scan.ocr_result))
-        .filter(Scan.id == scan_id)
+        select(Scan).options(*SCAN_DETAIL_LOAD_OPTIONS).filter(Scan.id == scan_id)
     )
-    result = db.execute(stmt).unique().scalar_one_or_none()
+    result = (await db.execute(stmt)).unique().scalar_one_or_none()
     if result and result.ocr_result:
         # Add statement_date to the scan object
         result.statement_date = result.ocr_result.statement_date
     return result
 
 
-def update_scan(
-    db: Session, scan_id: int, scan_update: ScanProcessorUpdateSchema
+async def update_scan(
+    db: AsyncSession, scan_id: int, scan_update: ScanProcessorUpdateSchema
 ) -> Scan:
-    db_scan = get_scan(db, scan_id)
+    db_scan = await get_scan(db, scan_id)
     if db_scan:
         update_data = scan_update.dict(exclude_unset=True)
 
         for key, value in update_data.items():
             setattr(db_scan, key, value)
-        db.commit()
+        if "status" in update_data:
+            await apublish_scan_status(db, scan_id, db_scan.status)
+        await db.commit()
 
-        db.refresh(db_scan)
+        await db.refresh(db_scan)
     return db_scan
 
 
-def delete_scan(db: Session, scan_id: int) -> bool:
-    db_scan = get_scan(db, scan_id)
+async def delete_scan(db: AsyncSession, scan_id: int) -> bool:
+    db_scan = await get_scan(db, scan_id)
     if db_scan:
-        db.delete(db_scan)
-        db.commit()
+        await db.delete(db_scan)
+        await db.commit()
 
         return True
 
     return False
 
 
-def list_scans(db: Session, advisor_id: int, skip: int = 0, limit: int = 100):
+def encode_scan_cursor(created_at: int, scan_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}:{scan_id}".encode()).decode()
+
+
+def decode_scan_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Raises:
+        ValueError: If the cursor wasn't produced by encode_scan_cursor
+    """
+    try:
+        created_at, scan_id = base64.urlsafe_b64decode(cursor.encode()).split(b":")
+        return int(created_at), int(scan_id)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def list_scans(
+    db: AsyncSession, advisor_id: int, cursor: Optional[str] = None, limit: int = 50
+) -> Tuple[List[ScanListItemSchema], Optional[str]]:
+    """
+    Page through the scans of an advisor, newest first.
+
+    Keyset pagination on (created_at, id), walking the
+    (advisor_id, created_at, id) index backwards: a page reads limit + 1 index
+    entries whatever its position. Only the list columns and the account
+    aggregates stored on the scan are selected, no child rows are loaded.
+
+    Returns:
+        (scans, next_cursor): next_cursor is None on the last page
+    """
     stmt = (
-        select(Scan)
-        .outerjoin(Scan.ocr_result)
-        .outerjoin(Scan.accounts)
-        .join(Scan.prospect)
-        .join(Prospect.advisor)
-        .options(contains_eager(Scan.ocr_result), contains_eager(Scan.accounts))
-        .filter(Advisor.id == advisor_id)
-        .offset(skip)
-        .limit(limit)
+        select(
+            Scan.id,
+            Scan.file_name,
+            Scan.status,
+            Scan.prospect_id,
+            Scan.created_at,
+            Scan.updated_at,
+            Prospect.first_name.label("investor_first_name"),
+            Prospect.last_name.label("investor_last_name"),
+            OcrResult.statement_date,
+            Scan.total_value.label("amount"),
+            Scan.institutions.label("institution"),
+            Scan.account_count,
+            Scan.holding_count,
+        )
+        .join(Prospect, Scan.prospect_id == Prospect.id)
+        .outerjoin(OcrResult, OcrResult.scan_id == Scan.id)
+        .filter(Scan.advisor_id == advisor_id)
+        .order_by(Scan.created_at.desc(), Scan.id.desc())
+        .limit(limit + 1)
     )
-    results = db.execute(stmt).unique().scalars().all()
+    if cursor:
+        stmt = stmt.filter(
+            tuple_(Scan.created_at, Scan.id) < tuple_(*decode_scan_cursor(cursor))
+        )
 
-    # The statement_date will be automatically available through the property
-    # we added to the Scan model
-    return results
+    rows = (await db.execute(stmt)).all()
+    scans = [ScanListItemSchema.model_validate(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = scans[-1]
+        next_cursor = encode_scan_cursor(last.created_at, last.id)
+    return scans, next_cursor
 
 
-def get_scans_by_prospect_id(db: Session, advisor_id: int, prospect_id: int):
-    return (
-        db.query(Scan)
+async def get_scans_by_prospect_id(
+    db: AsyncSession, advisor_id: int, prospect_id: int
+):
+    stmt = (
+        select(Scan)
         .join(Scan.prospect)
         .join(Prospect.advisor)
         .filter(Prospect.id == prospect_id, Advisor.id == advisor_id)
-        .all()
     )
+    return (await db.scalars(stmt)).all()
 
 
-def get_scan_with_relations(db: Session, scan_id: int) -> Scan:
-    return (
-        db.query(Scan)
+async def get_scan_with_relations(db: AsyncSession, scan_id: int) -> Scan:
+    stmt = (
+        select(Scan)
         .filter(Scan.id == scan_id)
-        .options(contains_eager(Scan.ocr_result), contains_eager(Scan.accounts))
-        .first()
+        .options(selectinload(Scan.ocr_result), selectinload(Scan.accounts))
     )
+    return (await db.scalars(stmt)).first()
+
+
+# Scan processing. The scan workers run these with sync sessions, off the
+# event loop.
 
 
 def create_ocr_result(
@@ -114,30 +215,263 @@ def create_ocr_result(
     return db_ocr_result
 
 
-async def process_file(scan_id: int, document_base64):
+def save_scan_results(
+    db: Session,
+    scan_id: int,
+    ocr_result_create: OcrResultSchema,
+    extracted_data: ScanExtractedDataSchema,
+    scan_status: ScanStatus = ScanStatus.PROCESSED,
+    ocr_text: Optional[OcrTextSchema] = None,
+    accounts_persisted: bool = False,
+) -> None:
+    """
+    Persist the OCR result and text, the extracted accounts and holdings, and
+    the new scan status in a single transaction.
+
+    Args:
+        accounts_persisted: The accounts were already saved as they were
+            streamed, only the scan aggregates are refreshed
+    """
+    db.add(OcrResult(**ocr_result_create.model_dump()))
+    if ocr_text is not None:
+        create_ocr_text(db, ocr_text)
+    if not accounts_persisted:
+        bulk_create_accounts(db, extracted_data.accounts, scan_id)
+    db.execute(
+        update(Scan)
+        .where(Scan.id == scan_id)
+        .values(status=scan_status, **scan_aggregate_values(scan_id))
+    )
+    publish_scan_status(db, scan_id, scan_status)
+    db.commit()
+
+
+def _claimable_scan_filter(now: int, max_attempts: int):
+    """
+    Scans waiting in the queue, or stuck in PROCESSING because the worker that
+    held them stopped renewing its lease.
+    """
+    return and_(
+        Scan.attempts < max_attempts,
+        or_(
+            Scan.status == ScanStatus.UPLOADED,
+            and_(
+                Scan.status == ScanStatus.PROCESSING,
+                or_(Scan.lease_expires_at.is_(None), Scan.lease_expires_at < now),
+            ),
+        ),
+    )
+
+
+def claim_next_scan(
+    db: Session, worker_id: str, lease_seconds: int, max_attempts: int
+) -> Optional[Scan]:
+    """
+    Claim the oldest queued scan for a worker.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never claim
+    the same row and never block on each other.
+    """
+    now = utc_timestamp()
+    stmt = (
+        select(Scan)
+        .filter(_claimable_scan_filter(now, max_attempts))
+        .order_by(Scan.created_at, Scan.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    db_scan = db.execute(stmt).scalar_one_or_none()
+    if db_scan is None:
+        db.rollback()
+        return None
+
+    db_scan.status = ScanStatus.PROCESSING
+    db_scan.worker_id = worker_id
+    db_scan.attempts += 1
+    db_scan.heartbeat_at = now
+    db_scan.lease_expires_at = now + lease_seconds
+    publish_scan_status(db, db_scan.id, db_scan.status)
+    db.commit()
+
+    db.refresh(db_scan)
+    return db_scan
+
+
+def renew_scan_lease(
+    db: Session, scan_id: int, worker_id: str, lease_seconds: int
+) -> bool:
+    """
+    Extend the lease of a scan held by the worker. Returns False if the lease
+    was lost (expired and claimed by another worker, or the scan finished).
+    """
+    now = utc_timestamp()
+    result = db.execute(
+        update(Scan)
+        .where(
+            Scan.id == scan_id,
+            Scan.worker_id == worker_id,
+            Scan.status == ScanStatus.PROCESSING,
+        )
+        .values(heartbeat_at=now, lease_expires_at=now + lease_seconds)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def release_failed_scan(
+    db: Session, scan_id: int, worker_id: str, max_attempts: int
+) -> Optional[Scan]:
+    """
+    Put a failed scan back in the queue, or mark it as ERROR once it has used
+    all of its attempts.
+    """
+    db_scan = db.get(Scan, scan_id)
+    if db_scan is None or db_scan.worker_id != worker_id:
+        return None
+
+    # Accounts streamed before the failure would show on the scan until the
+    # next attempt, or for good once it is errored
+    discard_scan_accounts(db, scan_id)
+    db_scan.status = (
+        ScanStatus.ERROR
+        if db_scan.attempts >= max_attempts
+        else ScanStatus.UPLOADED
+    )
+    db_scan.worker_id = None
+    db_scan.lease_expires_at = None
+    publish_scan_status(db, scan_id, db_scan.status)
+    db.commit()
+
+    db.refresh(db_scan)
+    return db_scan
+
+
+def expire_abandoned_scans(db: Session, max_attempts: int) -> int:
+    """
+    Mark scans whose lease expired after their last attempt as ERROR, so they
+    don't stay in PROCESSING forever.
+    """
+    now = utc_timestamp()
+    expired_ids = db.execute(
+        update(Scan)
+        .where(
+            Scan.status == ScanStatus.PROCESSING,
+            Scan.attempts >= max_attempts,
+            or_(Scan.lease_expires_at.is_(None), Scan.lease_expires_at < now),
+        )
+        .values(status=ScanStatus.ERROR, worker_id=None, lease_expires_at=None)
+        .returning(Scan.id)
+    ).scalars().all()
+    for scan_id in expired_ids:
+        discard_scan_accounts(db, scan_id)
+        publish_scan_status(db, scan_id, ScanStatus.ERROR)
+    db.commit()
+    return len(expired_ids)
+
+
+async def process_file(scan_id: int, pdf_bytes: bytes):
     print(f"Processing file {scan_id}")
-    with SessionLocal() as db:
-        print(f"Scanning document with id {scan_id}")
-        statement_processor = FinancialStatementProcessor()
-        results = await statement_processor.process_scan(document_base64)
-        print(f"Extracted data: {scan_id}")
-        # Create scan update with status from results
-        update = ScanProcessorUpdateSchema(status=results["status"])
-        update_scan(db, scan_id, update)
-
-        # Create OCR result with all available data
-        ocr_result_create = OcrResultSchema(
-            scan_id=scan_id,
-            statement_date=results["extracted_data"].statement_date,
-            ocr_source=results["ocr_source"],
-            llm_source=results["llm_source"],
-            page_count=results["page_count"],
-            ocr_text=results["ocr_text"],
-            ocr_text_cleaned=results["ocr_text_cleaned"],
-            processing_time=results["processing_time"],
+    print(f"Scanning document with id {scan_id}")
+    statement_processor = FinancialStatementProcessor()
+
+    # Accounts an earlier attempt streamed, whatever the streaming setting now
+    await asyncio.to_thread(_discard_scan_accounts, scan_id)
+
+    streamed_account_ids: List[int] = []
+
+    async def save_streamed_account(account: AccountCreateSchema) -> None:
+        streamed_account_ids.append(
+            await asyncio.to_thread(_save_streamed_account, scan_id, account)
         )
-        create_ocr_result(db, ocr_result_create)
-        for account_create in results["extracted_data"].accounts:
-            create_account(db, account_create, scan_id)
 
+    on_account = (
+        save_streamed_account if app_config.LLM_STREAMING_EXTRACTION else None
+    )
+    results = await statement_processor.process_scan(
+        pdf_bytes, on_account=on_account
+    )
+    print(f"Extracted data: {scan_id}")
+
+    # Create OCR result with all available data
+    ocr_result_create = OcrResultSchema(
+        scan_id=scan_id,
+        statement_date=results["extracted_data"].statement_date,
+        ocr_source=results["ocr_source"],
+        llm_source=results["llm_source"],
+        page_count=results["page_count"],
+        processing_time=results["processing_time"],
+    )
+    await asyncio.to_thread(
+        _save_processed_scan,
+        scan_id,
+        ocr_result_create,
+        results,
+        len(streamed_account_ids),
+    )
+
+
+def discard_scan_accounts(db: Session, scan_id: int) -> None:
+    """
+    Delete the accounts of a scan and reset its aggregates, without
+    committing.
+    """
+    delete_scan_accounts(db, scan_id)
+    refresh_scan_aggregates(db, scan_id)
+
+
+def _discard_scan_accounts(scan_id: int) -> None:
+    with SessionLocal() as db:
+        discard_scan_accounts(db, scan_id)
         db.commit()
+
+
+def _save_streamed_account(scan_id: int, account: AccountCreateSchema) -> int:
+    """
+    Persist one streamed account and tell the status subscribers about it.
+    """
+    with SessionLocal() as db:
+        (account_id,) = bulk_create_accounts(db, [account], scan_id)
+        refresh_scan_aggregates(db, scan_id)
+        # Holdings are left out, NOTIFY payloads are limited to 8000 bytes
+        publish_scan_status(
+            db,
+            scan_id,
+            ScanStatus.PROCESSING,
+            event="account",
+            account={
+                **account.model_dump(mode="json", exclude={"holdings"}),
+                "id": account_id,
+                "holding_count": len(account.holdings),
+            },
+        )
+        db.commit()
+    return account_id
+
+
+def _save_processed_scan(
+    scan_id: int,
+    ocr_result_create: OcrResultSchema,
+    results: dict,
+    streamed_account_count: int = 0,
+) -> None:
+    extracted_data = results["extracted_data"]
+    accounts_persisted = streamed_account_count == len(extracted_data.accounts)
+    with SessionLocal() as db:
+        if streamed_account_count and not accounts_persisted:
+            # Some streamed account failed to parse, keep the final parse
+            delete_scan_accounts(db, scan_id)
+        # The scan is flagged as processed in the same transaction that
+        # persists its data
+        save_scan_results(
+            db,
+            scan_id,
+            ocr_result_create,
+            extracted_data,
+            scan_status=results["status"],
+            ocr_text=OcrTextSchema(
+                scan_id=scan_id,
+                ocr_text=results["ocr_text"],
+                ocr_text_cleaned=results["ocr_text_cleaned"],
+            ),
+            accounts_persisted=accounts_persisted,
+        )
@@ -2,12 +2,13 @@ from typing import List, Optional
 from sqlalchemy.exc import IntegrityError
 from pydantic import ValidationError
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from app.utils.hash import Hash
 from app.models.database.orm_models import User
 from app.models.schemas.user_schema import UserCreateSchema, UserUpdateSchema
 from app.models.enums import Role
 from app.models.database import advisor_db
+from app.services.identity_cache import identity_cache
 
 
 user_not_found_exception = HTTPException(
@@ -16,7 +17,13 @@ user_not_found_exception = HTTPException(
 )
 
 
-def create_user(db: Session, request: UserCreateSchema) -> Optional[User]:
+def create_user(
+    db: Session, request: UserCreateSchema, hashed_password: Optional[bytes] = None
+) -> Optional[User]:
+    """
+    Create a user. Pass hashed_password when the password was already hashed,
+    e.g. with Hash.abcrypt off the event loop.
+    """
     try:
         new_user = User(
             email=request.email,
@@ -24,7 +31,7 @@ def create_user(db: Session, request: UserCreateSchema) -> Optional[User]:
             role=Role(request.role),
             first_name=request.first_name,
             last_name=request.last_name,
-            password=Hash.bcrypt(request.password),
+            password=hashed_password or Hash.bcrypt(request.password),
             phone_number=request.phone_number,
         )
         db.add(new_user)
@@ -69,7 +76,13 @@ def get_all_users(db: Session) -> List[User]:
 
 def get_user(db: Session, id: int) -> Optional[User]:
     try:
-        user_data = db.query(User).filter(User.id == id).first()
+        # Load the advisor with the user, async routes can't lazy load it
+        user_data = (
+            db.query(User)
+            .options(joinedload(User.advisor))
+            .filter(User.id == id)
+            .first()
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -89,6 +102,7 @@ def update_user(db: Session, id: int, request: UserUpdateSchema) -> User:
         user.last_name = request.last_name
         user.phone_number = request.phone_number
         db.commit()
+        identity_cache.invalidate(id)
         db.refresh(user)
         return user
 
@@ -110,6 +124,7 @@ def delete_user(db: Session, id: int) -> str:
     try:
         db.delete(user)
         db.commit()
+        identity_cache.invalidate(id)
         return "ok"
 
     except Exception as e:
@@ -129,6 +144,13 @@ def get_all_users_by_firm(db: Session, firm_id: int) -> List[User]:
         )
 
 
-def update_user_password(db: Session, user: User, new_password: str) -> None:
-    user.password = Hash.bcrypt(new_password)
+def update_user_password(
+    db: Session,
+    user: User,
+    new_password: str,
+    hashed_password: Optional[bytes] = None,
+) -> None:
+    user_id = user.id
+    user.password = hashed_password or Hash.bcrypt(new_password)
     db.commit()
+    identity_cache.invalidate(user_id)
@@ -58,23 +58,68 @@ class ScanDisplaySchema(FileUploadSchema):
         example=20240830,
     )
 
-    @computed_field
-    def amount(self) -> float:
-        """Total value of all accounts in the scan"""
-        return sum(account.account_value or 0 for account in self.accounts)
+    amount: float = Field(
+        default=0.0, description="Total value of all accounts in the scan"
+    )
+    institution: str = Field(
+        default="",
+        description="Comma-separated list of unique institutions in the scan",
+    )
+    account_count: int = Field(
+        default=0, description="Number of accounts in the scan", example=3
+    )
+    holding_count: int = Field(
+        default=0, description="Number of holdings in the scan", example=42
+    )
 
-    @computed_field
-    def institution(self) -> str:
-        """Comma-separated list of unique institutions in the scan"""
-        return ", ".join(
-            sorted(
-                set(
-                    account.institution
-                    for account in self.accounts
-                    if account.institution
-                )
-            )
-        )
+    class Config:
+        from_attributes = True
+
+
+class ScanListItemSchema(BaseModel):
+    """
+    Row of the scan list, built from the list columns and the account
+    aggregates stored on the scan instead of the loaded accounts.
+    """
+
+    id: int = Field(description="ID of the scan", example=1)
+    file_name: str = Field(description="Name of the file", example="scan.pdf")
+    status: ScanStatus = Field(
+        description="Current status of the scan", example="completed"
+    )
+    prospect_id: Optional[int] = Field(
+        default=None,
+        description="ID of the prospect associated with the scan",
+        example=1,
+    )
+    investor_first_name: Optional[str] = Field(default=None, example="John")
+    investor_last_name: Optional[str] = Field(default=None, example="Doe")
+    created_at: int = Field(
+        description="Timestamp when the scan was created",
+        example=1672537600,
+    )
+    updated_at: int = Field(
+        description="Timestamp when the scan was last updated",
+        example=1672540800,
+    )
+    statement_date: Optional[int] = Field(
+        default=None,
+        description="Date of the statement in format YYYYMMDD",
+        example=20240830,
+    )
+    amount: float = Field(
+        default=0.0, description="Total value of all accounts in the scan"
+    )
+    institution: str = Field(
+        default="",
+        description="Comma-separated list of unique institutions in the scan",
+    )
+    account_count: int = Field(
+        default=0, description="Number of accounts in the scan", example=3
+    )
+    holding_count: int = Field(
+        default=0, description="Number of holdings in the scan", example=42
+    )
 
     class Config:
         from_attributes = True
@@ -100,12 +145,6 @@ class OcrResultSchema(BaseModel):
     error_message: Optional[str] = Field(
         default=None, description="Error message if the OCR failed"
     )
-    ocr_text: Optional[str] = Field(
-        default=None, description="Raw OCR text", example="Raw OCR text"
-    )
-    ocr_text_cleaned: Optional[str] = Field(
-        default=None, description="Cleaned OCR text", example="Cleaned OCR text"
-    )
     processing_time: Optional[float] = Field(
         default=None, description="Processing time in seconds", example=1.5
     )
@@ -119,6 +158,19 @@ class OcrResultSchema(BaseModel):
         from_attributes = True
 
 
+class OcrTextSchema(BaseModel):
+    scan_id: int = Field(description="ID of the scan", example=1)
+    ocr_text: Optional[str] = Field(
+        default=None, description="Raw OCR text", example="Raw OCR text"
+    )
+    ocr_text_cleaned: Optional[str] = Field(
+        default=None, description="Cleaned OCR text", example="Cleaned OCR text"
+    )
+
+    class Config:
+        from_attributes = True
+
+
 class ScanProcessorUpdateSchema(BaseModel):
     prospect_id: Optional[int] = Field(
         default=None, description="ID of the prospect", example=1
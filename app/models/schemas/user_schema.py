@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel, Field
 from app.models.enums import Role
 
@@ -64,6 +65,34 @@ class UserDisplaySchema(UserBaseSchema):
         from_attributes = True
 
 
+class AuthenticatedAdvisorSchema(BaseModel):
+    id: int = Field(description="Unique identifier for the advisor", example=1)
+
+    class Config:
+        from_attributes = True
+
+
+class AuthenticatedUserSchema(BaseModel):
+    """
+    Identity of the authenticated user, resolved by get_current_user.
+    """
+
+    id: int = Field(description="Unique identifier for the user", example=1)
+    firm_id: Optional[int] = Field(
+        default=None, description="ID of the firm the user belongs to", example=1
+    )
+    role: Role = Field(description="Role of the user in the system")
+    email: str = Field(description="Email address of the user")
+    first_name: Optional[str] = Field(default=None)
+    last_name: Optional[str] = Field(default=None)
+    advisor: Optional[AuthenticatedAdvisorSchema] = Field(
+        default=None, description="Advisor profile of the user, if any"
+    )
+
+    class Config:
+        from_attributes = True
+
+
 class UserDetailDisplaySchema(UserDisplaySchema):
     created_at: int = Field(
         description="Timestamp when the user was created", example=1622547800
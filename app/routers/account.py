@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 from app.utils.auth import get_current_user
 from app.models.database import account_db
-from app.models.database.orm_models import User, Holding
+from app.models.database.ownership_db import get_owned_account
+from app.models.database.orm_models import Account, User
 from app.models.schemas.account_schema import (
     AccountDisplaySchema,
     AccountDetailDisplaySchema,
     AccountUpdateSchema,
 )
-from app.utils.db_connection_manager import get_db
+from app.utils.db_connection_manager import get_async_db
 
 
 router = APIRouter(
@@ -18,21 +20,39 @@ router = APIRouter(
 )
 
 
+async def _get_authorized_account(
+    db: AsyncSession, current_user: User, account_id: int, forbidden_detail: str
+) -> Account:
+    account, is_owner = await get_owned_account(
+        db,
+        current_user.advisor.id,
+        account_id,
+        options=[selectinload(Account.holdings)],
+    )
+    if account is None:
+        raise account_db.account_not_found_exception
+    if not is_owner:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=forbidden_detail
+        )
+    return account
+
+
 @router.get(
     "/prospect/{prospect_id}",
     response_model=List[AccountDisplaySchema],
     status_code=status.HTTP_200_OK,
 )
-def get_accounts_by_prospect(
+async def get_accounts_by_prospect(
     prospect_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Get a list of accounts for a given prospect.
     """
     # Authorization checks
-    if not account_db.is_advisor_prospect(
+    if not await account_db.is_advisor_prospect(
         db, current_user.advisor.id, prospect_id
     ):
         raise HTTPException(
@@ -40,7 +60,7 @@ def get_accounts_by_prospect(
             detail="Not authorized to access these accounts",
         )
 
-    accounts = account_db.get_accounts_by_prospect(db, prospect_id)
+    accounts = await account_db.get_accounts_by_prospect(db, prospect_id)
     return accounts
 
 
@@ -49,23 +69,18 @@ def get_accounts_by_prospect(
     response_model=AccountDetailDisplaySchema,
     status_code=status.HTTP_200_OK,
 )
-def get_account_by_id(
+async def get_account_by_id(
     account_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Get account details by account ID, including holdings.
     """
-    # Authorization checks
-
-    if not account_db.is_advisor_account(db, current_user.advisor.id, account_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this account",
-        )
-
-    account = account_db.get_account_by_id(db, account_id)
+    # Authorization checks, loading the account with its holdings
+    account = await _get_authorized_account(
+        db, current_user, account_id, "Not authorized to access this account"
+    )
     return account
 
 
@@ -74,25 +89,20 @@ def get_account_by_id(
     response_model=AccountDetailDisplaySchema,
     status_code=status.HTTP_202_ACCEPTED,
 )
-def update_account(
+async def update_account(
     account_id: int,
     account_update: AccountUpdateSchema,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Update an existing account's information.
     """
     # Authorization checks
-    if not account_db.is_advisor_account(db, current_user.advisor.id, account_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this account",
-        )
-
-    updated_account = account_db.update_account(db, account_id, account_update)
-    # Fetch the holdings after update
-    updated_account.holdings = (
-        db.query(Holding).filter(Holding.account_id == account_id).all()
+    account = await _get_authorized_account(
+        db, current_user, account_id, "Not authorized to update this account"
     )
+
+    # The holdings are loaded with the account
+    updated_account = await account_db.update_account(db, account, account_update)
     return updated_account
@@ -20,18 +20,20 @@ from app.models.schemas.auth_schema import (
 from jose import JWTError, ExpiredSignatureError
 from app.models.database.user_db import User, update_user_password
 from app.services.communication import EmailService
+from app.utils.hash import Hash
+import asyncio
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
 @router.post("/token", response_model=TokenResponseSchema)
-def login_for_access_token(
+async def login_for_access_token(
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    user = await authenticate_user(form_data.username, form_data.password, db)
     access_token, access_expires = create_access_token(
         user.email, str(user.id), user.role.value
     )
@@ -44,7 +46,8 @@ def login_for_access_token(
         samesite="none" if app_config.DEBUG else "lax",
         expires=refresh_expires,
     )
-    user.update_login_info(db)
+    # Also saves the rehashed password, if any
+    await asyncio.to_thread(user.update_login_info, db)
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -91,7 +94,10 @@ async def reset_password(
         user_id = verify_token(request.token, "access")
         user = get_user(db, int(user_id))
         # Update password using the utility function
-        update_user_password(db, user, request.new_password)
+        hashed_password = await Hash.abcrypt(request.new_password)
+        update_user_password(
+            db, user, request.new_password, hashed_password=hashed_password
+        )
 
         # Notify user of successful password change
         return {"message": "Password has been successfully reset"}
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app.models.schemas.prospect_schema import (
     ProspectCreateSchema,
@@ -15,7 +15,7 @@ from app.models.database.prospect_db import (
     delete_prospect,
 )
 from app.utils.auth import get_current_user
-from app.utils.db_connection_manager import get_db
+from app.utils.db_connection_manager import get_async_db
 from app.models.database.user_db import User
 from app.models.enums import Role
 from app.models.database.scan_db import get_scans_by_prospect_id
@@ -23,8 +23,10 @@ from app.models.database.scan_db import get_scans_by_prospect_id
 router = APIRouter(prefix="/prospects", tags=["Prospects"])
 
 
-def get_prospect_or_404(prospect_id: int, db: Session, current_user: User):
-    prospect = get_prospect(db, prospect_id)
+async def get_prospect_or_404(
+    prospect_id: int, db: AsyncSession, current_user: User
+):
+    prospect = await get_prospect(db, prospect_id)
     if (
         not prospect
         or not current_user.advisor
@@ -41,9 +43,9 @@ def get_prospect_or_404(prospect_id: int, db: Session, current_user: User):
     description="Create a new prospect associated with the current advisor.",
     response_description="The created prospect.",
 )
-def create_prospect_route(
+async def create_prospect_route(
     prospect: ProspectCreateSchema,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role != Role.ADVISOR:
@@ -58,7 +60,7 @@ def create_prospect_route(
     prospect_data = ProspectCreateSchema(
         first_name=prospect.first_name, last_name=prospect.last_name
     )
-    return create_prospect(db, prospect_data, advisor_id=current_user.advisor.id)
+    return await create_prospect(db, prospect_data, advisor_id=current_user.advisor.id)
 
 
 @router.get(
@@ -68,14 +70,14 @@ def create_prospect_route(
     description="Retrieve a list of prospects associated with the current advisor.",
     response_description="A list of prospects.",
 )
-def get_prospects_route(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+async def get_prospects_route(
+    db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)
 ):
     if current_user.role != Role.ADVISOR:
         raise HTTPException(
             status_code=403, detail="Only advisors can view prospects"
         )
-    return get_prospects_by_advisor(db, current_user.advisor.id)
+    return await get_prospects_by_advisor(db, current_user.advisor.id)
 
 
 @router.get(
@@ -85,17 +87,19 @@ def get_prospects_route(
     description="Retrieve a prospect by ID along with their associated documents.",
     response_description="The retrieved prospect with documents.",
 )
-def get_prospect_route(
+async def get_prospect_route(
     prospect_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    prospect = get_prospect_or_404(prospect_id, db, current_user)
-    scans = get_scans_by_prospect_id(db, prospect_id)
+    prospect = await get_prospect_or_404(prospect_id, db, current_user)
+    scans = await get_scans_by_prospect_id(
+        db, current_user.advisor.id, prospect_id
+    )
     return ProspectDetailDisplaySchema(
         first_name=prospect.first_name,
         last_name=prospect.last_name,
-        scans=[doc.filename for doc in scans],
+        scans=[doc.file_name for doc in scans],
     )
 
 
@@ -106,14 +110,14 @@ def get_prospect_route(
     description="Update the details of a prospect by their ID.",
     response_description="The updated prospect.",
 )
-def update_prospect_route(
+async def update_prospect_route(
     prospect_id: int,
     prospect_update: ProspectUpdateSchema,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    prospect = get_prospect_or_404(prospect_id, db, current_user)
-    return update_prospect(db, prospect, prospect_update)
+    prospect = await get_prospect_or_404(prospect_id, db, current_user)
+    return await update_prospect(db, prospect, prospect_update)
 
 
 @router.delete(
@@ -123,10 +127,10 @@ def update_prospect_route(
     response_description="The deleted prospect.",
     status_code=status.HTTP_204_NO_CONTENT,
 )
-def delete_prospect_route(
+async def delete_prospect_route(
     prospect_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    get_prospect_or_404(prospect_id, db, current_user)
-    delete_prospect(db, prospect_id)
+    await get_prospect_or_404(prospect_id, db, current_user)
+    await delete_prospect(db, prospect_id)
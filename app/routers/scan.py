@@ -4,42 +4,53 @@ from fastapi import (
     HTTPException,
     UploadFile,
     File,
+    Query,
+    Response,
     # Form,
     status,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.database.scan_db import (
+    SCAN_DETAIL_LOAD_OPTIONS,
+    count_queued_scans,
     create_scan,
-    get_scan,
     list_scans,
     delete_scan,
-    process_file,
-    get_scan_with_ocr_result,
+    read_scan_status,
+)
+from app.models.database.ocr_text_db import get_ocr_text
+from app.models.database.ownership_db import (
+    advisor_owns_prospect,
+    advisor_owns_scan,
+    get_owned_scan,
 )
 from app.models.schemas.scan_schema import (
     ScanCreateSchema,
-    ScanDisplaySchema,
     ScanDisplayDetailSchema,
+    ScanListItemSchema,
+    OcrTextSchema,
 )
+from app.config import app_config
 from app.models.enums import ScanStatus
-from app.models.database.prospect_db import get_prospect
-import base64
 from app.utils.auth import get_current_user
-from app.utils.db_connection_manager import get_db
+from app.utils.db_connection_manager import get_async_db, AsyncSessionLocal
 from app.models.database.orm_models import User
 from fastapi.responses import StreamingResponse
 from fastapi import BackgroundTasks
-from asyncio import sleep
+from typing import Optional
+import asyncio
+import json
 from app.services.storage import upload_statement_file
+from app.services.scan_worker import scan_worker_pool
+from app.services.scan_events import RESYNC_EVENT, scan_status_broker
 from app.models.schemas.scan_schema import FileUploadSchema
-import asyncio
 
 
 router = APIRouter(prefix="/scans", tags=["scans"])
 
 
-def check_prospect_ownership(
-    db: Session, advisor_id: int, prospect_id: int
+async def check_prospect_ownership(
+    db: AsyncSession, advisor_id: int, prospect_id: int
 ) -> bool:
     """
     Check if the given user owns the specified prospect.
@@ -49,15 +60,12 @@ def check_prospect_ownership(
     :param prospect_id: ID of the prospect
     :return: True if the advisor owns the prospect, False otherwise
     """
-    # Assuming you have a Prospect model with a relationship to the User model
-    prospect = get_prospect(db, prospect_id)
-    if prospect is None:
-        return False
+    return await advisor_owns_prospect(db, advisor_id, prospect_id)
 
-    return prospect.advisor_id == advisor_id
 
-
-def check_scan_ownership(db: Session, advisor_id: int, scan_id: int) -> bool:
+async def check_scan_ownership(
+    db: AsyncSession, advisor_id: int, scan_id: int
+) -> bool:
     """
     Check if the given advisor owns the specified scan.
 
@@ -66,51 +74,79 @@ def check_scan_ownership(db: Session, advisor_id: int, scan_id: int) -> bool:
     :param scan_id: ID of the scan
     :return: True if the advisor owns the scan, False otherwise
     """
-    scan = get_scan(db, scan_id)
-    if scan is None:
-        return False
-    return scan.prospect.advisor_id == advisor_id
+    return await advisor_owns_scan(db, advisor_id, scan_id)
 
 
 async def get_scan_status_stream(
     scan_id: int,
-    db: Session,
     timeout: int = 300,
-    initial_wait: int = 15,
-    interval: int = 3,
+    keepalive_interval: int = 15,
 ):
     """
-    Get the status of a scan. Times out after timeout seconds.
+    Stream the status of a scan until it is processed or errored. Times out
+    after timeout seconds.
+
+    Status changes are pushed by the scan status broker, so the stream holds
+    no database connection while it waits. Accounts saved while the statement
+    is being extracted are sent as "account" events. If the broker is not listening,
+    it falls back to re-reading the status every keepalive_interval seconds,
+    and it re-reads it once the broker has reconnected.
     """
-    await sleep(initial_wait)
-    elapsed = initial_wait
-    scan = get_scan(db, scan_id)
-    while True:
-        db.refresh(scan)
-        if scan.status in [ScanStatus.PROCESSED, ScanStatus.ERROR]:
-            yield f"data: {scan.status.value}\n\n"
-            break
-        await sleep(interval)
-        elapsed += interval
-        if elapsed > timeout:
-            yield f"data: {ScanStatus.ERROR.value}\n\n"
-            break
+    with scan_status_broker.subscribe(scan_id) as events:
+        # Read the status after subscribing so no change can be missed
+        status = await _read_scan_status(scan_id)
+        status = status or ScanStatus.ERROR
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while status not in [ScanStatus.PROCESSED, ScanStatus.ERROR]:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                status = ScanStatus.ERROR
+                break
+            try:
+                event = await asyncio.wait_for(
+                    events.get(), min(keepalive_interval, remaining)
+                )
+                if event.get("event") == RESYNC_EVENT:
+                    status = await _read_scan_status(scan_id)
+                    status = status or ScanStatus.ERROR
+                    continue
+                if event.get("event") == "account":
+                    yield f"event: account\ndata: {json.dumps(event['account'])}\n\n"
+                status = ScanStatus(event["status"])
+            except asyncio.TimeoutError:
+                if not scan_status_broker.is_listening:
+                    status = await _read_scan_status(scan_id)
+                    status = status or ScanStatus.ERROR
+                yield ": keepalive\n\n"
+        yield f"data: {status.value}\n\n"
+
+
+async def _read_scan_status(scan_id: int) -> Optional[ScanStatus]:
+    async with AsyncSessionLocal() as db:
+        return await read_scan_status(db, scan_id)
 
 
 @router.get("/{scan_id}/status")
 async def get_scan_status(
-    scan_id: int,
-    db: Session = Depends(get_db),
+    scan_id: int, current_user: User = Depends(get_current_user)
 ):
     """
-    Get the status of a scan.
+    Get the status of a scan, and its accounts as they are extracted.
     """
-    scan = get_scan(db, scan_id)
-    if scan is None:
+    # A session of its own, released before the stream starts waiting
+    async with AsyncSessionLocal() as db:
+        db_scan, is_owner = await get_owned_scan(db, current_user.advisor.id, scan_id)
+    if db_scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
 
+    if not is_owner:
+        raise HTTPException(
+            status_code=403, detail="You don't have permission to access this scan"
+        )
+
     return StreamingResponse(
-        get_scan_status_stream(scan_id, db), media_type="text/event-stream"
+        get_scan_status_stream(scan_id), media_type="text/event-stream"
     )
 
 
@@ -118,53 +154,55 @@ async def get_scan_status(
 async def upload_scan(
     prospect_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     background_tasks: BackgroundTasks = BackgroundTasks(),
 ):
-    # Read the file content
-    file_content = await file.read()
-    print("received file")
-    blob_name = await upload_statement_file(file_content, file.filename)
-    print("uploaded file")
+    # Shed load before accepting the file once the workers fall too far behind
+    if (
+        app_config.SCAN_QUEUE_CEILING > 0
+        and await count_queued_scans(db) >= app_config.SCAN_QUEUE_CEILING
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many scans are waiting to be processed, retry later",
+            headers={"Retry-After": str(app_config.SCAN_QUEUE_RETRY_AFTER_SECONDS)},
+        )
 
-    # Convert file content to base64
-    base64_content = base64.b64encode(file_content).decode("utf-8")
+    # Stream the file to blob storage without buffering it in memory
+    blob_name = await upload_statement_file(file, file.filename)
+    print("uploaded file")
 
-    # Create initial scan entry
+    # Create initial scan entry, which queues it for the scan workers
     scan_create = ScanCreateSchema(
         blob_name=blob_name,
-        uploaded_file=base64_content,
-        status=ScanStatus.PROCESSING,
+        status=ScanStatus.UPLOADED,
         file_name=file.filename,
         prospect_id=prospect_id,
     )
     print("created scan")
 
-    db_scan = create_scan(db, scan_create)
-    print("created scan in db")
+    db_scan = await create_scan(db, scan_create)
+    print("queued scan for processing")
 
-    asyncio.create_task(process_file(db_scan.id, base64_content))
-
-    # background_tasks.add_task(
-    #     process_file, db_scan.id, base64_content
-    # )
-    print("added task to process file")
+    scan_worker_pool.notify()
     return db_scan
 
 
 @router.get("/{scan_id}", response_model=ScanDisplayDetailSchema)
-def read_scan(
+async def read_scan(
     scan_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_scan = get_scan_with_ocr_result(db, scan_id)
+    # Load the scan and check that the current user owns it in one query
+    db_scan, is_owner = await get_owned_scan(
+        db, current_user.advisor.id, scan_id, options=SCAN_DETAIL_LOAD_OPTIONS
+    )
     if db_scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
 
-    # Check if the current user owns the scan
-    if not check_scan_ownership(db, current_user.advisor.id, scan_id):
+    if not is_owner:
         raise HTTPException(
             status_code=403, detail="You don't have permission to access this scan"
         )
@@ -172,34 +210,68 @@ def read_scan(
     return db_scan
 
 
-@router.get("/", response_model=list[ScanDisplaySchema])
-def read_scans(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+@router.get("/{scan_id}/ocr", response_model=OcrTextSchema)
+async def read_scan_ocr_text(
+    scan_id: int,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    scans = list_scans(
-        db, skip=skip, limit=limit, advisor_id=current_user.advisor.id
-    )
+    """
+    The raw and cleaned OCR text of a scan.
+    """
+    db_scan, is_owner = await get_owned_scan(db, current_user.advisor.id, scan_id)
+    if db_scan is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    if not is_owner:
+        raise HTTPException(
+            status_code=403, detail="You don't have permission to access this scan"
+        )
+
+    ocr_text = await get_ocr_text(db, scan_id)
+    if ocr_text is None:
+        raise HTTPException(status_code=404, detail="OCR text not found")
+    return ocr_text
+
+
+@router.get("/", response_model=list[ScanListItemSchema])
+async def read_scans(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    The scans of the advisor, newest first. Pass the X-Next-Cursor header of
+    a page as cursor to get the next one; it's absent on the last page.
+    """
+    try:
+        scans, next_cursor = await list_scans(
+            db, current_user.advisor.id, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return scans
 
 
 @router.delete("/{scan_id}")
-def delete_scan_route(
+async def delete_scan_route(
     scan_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     status_code=status.HTTP_204_NO_CONTENT,
 ):
-    db_scan = get_scan(db, scan_id)
+    db_scan, is_owner = await get_owned_scan(db, current_user.advisor.id, scan_id)
     if db_scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
 
     # Check if the current user owns the scan
-    if not check_scan_ownership(db, current_user.advisor.id, scan_id):
+    if not is_owner:
         raise HTTPException(
             status_code=403, detail="You don't have permission to delete this scan"
         )
 
-    delete_scan(db, scan_id)
+    await delete_scan(db, scan_id)
@@ -12,6 +12,8 @@ from sqlalchemy.orm import Session
 from app.utils.auth import get_current_user
 from app.models.enums import Role  # Import the Role enum
 from app.services.communication import EmailService
+from app.utils.hash import Hash
+import asyncio
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -33,13 +35,16 @@ def check_admin_and_firm(current_user: UserBaseSchema, user_firm_id: int):
     summary="Create a new user",
     description="Create a new user in the database. This endpoint is accessible to all",
 )
-def create_user(
+async def create_user(
     request: UserCreateSchema,
     db: Session = Depends(get_db),
     status_code=status.HTTP_201_CREATED,
     background_tasks: BackgroundTasks = BackgroundTasks(),
 ):
-    new_user = user_db.create_user(db, request)
+    hashed_password = await Hash.abcrypt(request.password)
+    new_user = await asyncio.to_thread(
+        user_db.create_user, db, request, hashed_password
+    )
     email_service = EmailService()
     background_tasks.add_task(
         email_service.send_welcome_email,
@@ -0,0 +1,112 @@
+"""
+Incremental parsing of a streamed ScanExtractedDataSchema completion.
+
+Structured outputs stream the JSON object in schema order, so the accounts
+array comes after the statement fields and each account ends with its
+holdings. AccountStreamParser scans the text as it arrives and hands out
+every account as soon as its closing brace is received, without waiting for
+the rest of the document.
+"""
+
+import json
+import logging
+from typing import List
+
+from pydantic import ValidationError
+
+from app.models.schemas.account_schema import AccountCreateSchema
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_KEY = "accounts"
+
+
+class AccountStreamParser:
+    """
+    Feed the completion text chunk by chunk; each call returns the accounts
+    completed by that chunk.
+    """
+
+    def __init__(self):
+        # Text not scanned yet, plus the account being received
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = -1
+        self._last_string = None
+        self._key = None
+        self._in_accounts = False
+        self._account_start = -1
+        self.account_count = 0
+
+    def feed(self, chunk: str) -> List[AccountCreateSchema]:
+        self._buffer += chunk
+        accounts = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = buffer[self._string_start + 1 : pos]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif char in "{[":
+                if self._in_accounts and self._depth == 2 and char == "{":
+                    self._account_start = pos
+                self._depth += 1
+                if self._depth == 2 and char == "[" and self._key == ACCOUNTS_KEY:
+                    self._in_accounts = True
+            elif char in "}]":
+                self._depth -= 1
+                if self._in_accounts and self._depth == 2 and char == "}":
+                    account = self._parse_account(buffer[self._account_start : pos + 1])
+                    if account is not None:
+                        accounts.append(account)
+                    self._account_start = -1
+                elif self._in_accounts and self._depth == 1:
+                    self._in_accounts = False
+
+        self._pos = len(buffer)
+        self._compact()
+        return accounts
+
+    def _parse_account(self, text: str):
+        try:
+            account = AccountCreateSchema.model_validate(json.loads(text))
+        except (ValueError, ValidationError) as e:
+            # The final parse of the whole completion still covers it
+            logger.warning(f"Skipping a streamed account that failed to parse: {e}")
+            return None
+        self.account_count += 1
+        return account
+
+    def _compact(self) -> None:
+        """
+        Drop the scanned text no pending account or key still points into.
+        """
+        keep_from = self._pos
+        if self._account_start >= 0:
+            keep_from = self._account_start
+        if self._in_string:
+            keep_from = min(keep_from, self._string_start)
+        if keep_from == 0:
+            return
+        self._buffer = self._buffer[keep_from:]
+        self._pos -= keep_from
+        if self._account_start >= 0:
+            self._account_start -= keep_from
+        if self._string_start >= 0:
+            self._string_start -= keep_from
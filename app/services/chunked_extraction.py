@@ -0,0 +1,188 @@
+"""
+Map-reduce extraction of long statements.
+
+The cleaned markdown is split after the page number markers kept by
+clean_markdown_text, consecutive pages are grouped into chunks, each chunk is
+extracted on its own, and the partial extractions are merged back into one
+ScanExtractedDataSchema. Accounts spanning several chunks are recognized by
+their account number, or, for accounts without one, by continuing from the
+end of the previous chunk, and merged along with their holdings.
+"""
+
+import re
+from collections import Counter
+from typing import Hashable, List, Optional
+
+from app.models.schemas.account_schema import AccountCreateSchema
+from app.models.schemas.extraction_schema import ScanExtractedDataSchema
+from app.models.schemas.holding_schema import HoldingCreateSchema
+
+# Azure Document Intelligence puts the page number in the page footer, so
+# a page ends right after its marker
+PAGE_NUMBER_MARKER = re.compile(r"<!--\s*PageNumber=\"[^\"]*\"\s*-->\n?")
+
+
+def split_statement_pages(text: str) -> List[str]:
+    """
+    Split the cleaned markdown after each page number marker. Text after the
+    last marker is its own page.
+    """
+    pages = []
+    start = 0
+    for match in PAGE_NUMBER_MARKER.finditer(text):
+        pages.append(text[start : match.end()])
+        start = match.end()
+    if text[start:].strip():
+        pages.append(text[start:])
+    return pages
+
+
+def _split_paragraphs(page: str) -> List[str]:
+    """
+    Split a page after each paragraph break, keeping the breaks.
+    """
+    paragraphs = re.split(r"(?<=\n\n)", page)
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+
+def group_pages(pages: List[str], max_chars: int) -> List[str]:
+    """
+    Group consecutive pages into chunks of at most max_chars characters.
+
+    A page longer than max_chars is split at its paragraph breaks instead.
+    This covers statements whose page number markers are missing, e.g.
+    when the page number is only in an "n of m" footer or the markers were
+    filtered out with the informational text: they are one long page. A
+    single paragraph longer than max_chars is a chunk of its own.
+    """
+    pieces = []
+    for page in pages:
+        if len(page) > max_chars:
+            pieces.extend(_split_paragraphs(page))
+        else:
+            pieces.append(page)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _normalize(value: Optional[str]) -> str:
+    return re.sub(r"[\s\-]", "", value or "").upper()
+
+
+def _most_common(values: list):
+    """
+    The most frequent truthy value, the earliest one on ties.
+    """
+    counts = Counter(value for value in values if value)
+    if not counts:
+        return None
+    return max(counts, key=lambda value: (counts[value], -values.index(value)))
+
+
+def _account_type_key(account: AccountCreateSchema) -> Hashable:
+    return (
+        _normalize(account.institution),
+        account.account_type,
+        _normalize(account.currency),
+    )
+
+
+def _holding_key(holding: HoldingCreateSchema) -> Hashable:
+    identifier = (
+        _normalize(holding.cusip)
+        or _normalize(holding.symbol)
+        or _normalize(holding.description)
+    )
+    return (identifier, holding.quantity, round(holding.market_value, 2))
+
+
+def _merge_accounts(parts: List[AccountCreateSchema]) -> AccountCreateSchema:
+    """
+    Merge the partial extractions of one account. Holdings repeated by a
+    later part are kept once, identical holdings within one part are all
+    kept, and the account value is the sum of the merged holdings.
+    """
+    merged_holdings = []
+    # Most holdings of each key found in one part so far
+    seen_counts = Counter()
+    for part in parts:
+        part_counts = Counter()
+        for holding in part.holdings:
+            key = _holding_key(holding)
+            part_counts[key] += 1
+            if part_counts[key] > seen_counts[key]:
+                merged_holdings.append(holding)
+        seen_counts |= part_counts
+
+    def first(field: str):
+        return next(
+            (getattr(part, field) for part in parts if getattr(part, field)), None
+        )
+
+    account_value = (
+        round(sum(holding.market_value for holding in merged_holdings), 2)
+        if merged_holdings
+        else first("account_value")
+    )
+    return AccountCreateSchema(
+        account_id=first("account_id"),
+        account_type=parts[0].account_type,
+        currency=first("currency"),
+        institution=first("institution"),
+        management_fee_amount=first("management_fee_amount"),
+        account_value=account_value,
+        holdings=merged_holdings,
+    )
+
+
+def merge_extracted_data(
+    parts: List[ScanExtractedDataSchema],
+) -> ScanExtractedDataSchema:
+    """
+    Merge the extractions of the chunks of a statement, in chunk order. The
+    result only depends on the parts and their order.
+    """
+    accounts: dict[Hashable, List[AccountCreateSchema]] = {}
+    # Key and type of the last account of the previous chunk, if unnumbered
+    previous_last: Optional[tuple] = None
+    for part_index, part in enumerate(parts):
+        last = None
+        for account_index, account in enumerate(part.accounts):
+            if _normalize(account.account_id):
+                key = ("id", _normalize(account.account_id))
+            elif (
+                account_index == 0
+                and previous_last is not None
+                and previous_last[1] == _account_type_key(account)
+            ):
+                # Unnumbered accounts of the same type and institution are
+                # only merged when one continues across a chunk boundary
+                key = previous_last[0]
+            else:
+                key = ("position", part_index, account_index)
+            accounts.setdefault(key, []).append(account)
+            last = None if key[0] == "id" else (key, _account_type_key(account))
+        previous_last = last
+    merged_accounts = [
+        _merge_accounts(account_parts) for account_parts in accounts.values()
+    ]
+
+    return ScanExtractedDataSchema(
+        statement_date=_most_common([part.statement_date for part in parts]) or 0,
+        investor_first_name=_most_common(
+            [part.investor_first_name for part in parts]
+        )
+        or "",
+        investor_last_name=_most_common([part.investor_last_name for part in parts])
+        or "",
+        accounts=merged_accounts,
+    )
@@ -0,0 +1,164 @@
+"""
+Process pool for the CPU-bound steps of the scan pipeline.
+
+Filtering the disclaimer pages of a PDF (text extraction, page
+classification and the rewrite of the PDF) and classifying the excerpts of
+its markdown hold the GIL for seconds on long statements. They run on a pool
+of worker processes, which load the classifier models when they start, so
+the event loop keeps serving requests meanwhile. Only bytes and strings
+cross the process boundary.
+
+With CPU_POOL_WORKERS=0 the steps run on a thread of the event loop's
+default executor instead.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.config import app_config
+from app.services.model_registry import model_registry
+from app.services.text_cleanup import (
+    remove_disclaimer_pages,
+    remove_informational_text,
+)
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_counters = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "restarts": 0,
+    "task_seconds_total": 0.0,
+}
+
+
+def _init_worker() -> None:
+    # Load the models before the first task instead of during it
+    model_registry.preload()
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _filter_pdf_pages(pdf_bytes: bytes) -> Optional[bytes]:
+    """
+    remove_disclaimer_pages, returning None rather than sending the PDF back
+    when every page is relevant.
+    """
+    filtered_pdf_bytes = remove_disclaimer_pages(pdf_bytes)
+    return None if filtered_pdf_bytes is pdf_bytes else filtered_pdf_bytes
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned rather than forked, so the workers don't inherit the event
+        # loop, threads and database connections of this process
+        _executor = ProcessPoolExecutor(
+            max_workers=app_config.CPU_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Drop a pool whose worker died, the next task starts a new one.
+    """
+    global _executor
+    if _executor is executor:
+        _executor = None
+        _counters["restarts"] += 1
+        logger.warning("A CPU pool worker died, restarting the pool")
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def start_cpu_pool() -> None:
+    """
+    Start every worker and wait until they have loaded the models, so the
+    first scans don't pay for it.
+    """
+    if app_config.CPU_POOL_WORKERS <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    # Workers are spawned on demand, while none is idle: submitting one task
+    # per worker at once starts all of them
+    pids = await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, _worker_pid)
+            for _ in range(app_config.CPU_POOL_WORKERS)
+        )
+    )
+    logger.info(f"CPU pool started with {len(set(pids))} warm worker(s)")
+
+
+async def stop_cpu_pool() -> None:
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+def cpu_pool_stats() -> dict:
+    counters = dict(_counters)
+    finished = counters["completed"] + counters["failed"]
+    return {
+        "workers": app_config.CPU_POOL_WORKERS,
+        "in_flight": counters["submitted"] - finished,
+        "completed": counters["completed"],
+        "failed": counters["failed"],
+        "restarts": counters["restarts"],
+        "mean_task_seconds": (
+            counters["task_seconds_total"] / finished if finished else 0.0
+        ),
+    }
+
+
+async def _run(fn, *args):
+    _counters["submitted"] += 1
+    start_time = time.perf_counter()
+    try:
+        if app_config.CPU_POOL_WORKERS <= 0:
+            result = await asyncio.to_thread(fn, *args)
+        else:
+            executor = _get_executor()
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    executor, fn, *args
+                )
+            except BrokenProcessPool:
+                _discard_executor(executor)
+                raise
+    except BaseException:
+        _counters["failed"] += 1
+        raise
+    finally:
+        _counters["task_seconds_total"] += time.perf_counter() - start_time
+    _counters["completed"] += 1
+    return result
+
+
+async def aremove_disclaimer_pages(pdf_bytes: bytes) -> bytes:
+    """
+    remove_disclaimer_pages on the CPU pool, without blocking the event loop.
+    """
+    filtered_pdf_bytes = await _run(_filter_pdf_pages, pdf_bytes)
+    return pdf_bytes if filtered_pdf_bytes is None else filtered_pdf_bytes
+
+
+async def aremove_informational_text(markdown_text: str) -> str:
+    """
+    remove_informational_text on the CPU pool, without blocking the event loop.
+    """
+    return await _run(remove_informational_text, markdown_text)
@@ -1,8 +1,8 @@
 import os
 import logging
-import joblib
 import warnings
 from sklearn.exceptions import InconsistentVersionWarning
+from app.services.model_registry import model_registry
 
 warnings.filterwarnings("ignore", category=InconsistentVersionWarning)
 
@@ -21,9 +21,8 @@ class ExerptClassifier:
         if not pipeline_path:
             raise ValueError("pipeline_path must be provided")
 
-        # Load pipeline using cloudpickle instead of joblib
-        with open(pipeline_path, "rb") as f:
-            self.pipeline = joblib.load(f)
+        # Shared across instances, loaded once per process
+        self.pipeline = model_registry.get(pipeline_path)
         self.threshold = 0.5
 
     def predict(self, text):
@@ -47,17 +46,25 @@ class ExerptClassifier:
             logging.error(f"Prediction error: {str(e)}")
             return False  # Default to not excluding on error
 
-    def predict_batch(self, texts):
+    def predict_batch(self, texts, batch_size=None):
         """Predict whether multiple text excerpts should be excluded.
 
         Args:
             texts (list): List of text excerpts to classify
+            batch_size (int, optional): Maximum number of excerpts per
+                predict_proba call, all of them at once if None
 
         Returns:
             list: List of booleans indicating whether each text should be excluded
         """
-        probs = self.pipeline.predict_proba(texts)
-        return [prob[1] > self.threshold for prob in probs]
+        if not texts:
+            return []
+        batch_size = batch_size or len(texts)
+        predictions = []
+        for start in range(0, len(texts), batch_size):
+            probs = self.pipeline.predict_proba(texts[start : start + batch_size])
+            predictions.extend((probs[:, 1] > self.threshold).tolist())
+        return predictions
 
     def filter_included(self, texts):
         """Filter a list of texts to keep only those that should be included.
@@ -68,15 +75,39 @@ class ExerptClassifier:
         Returns:
             list: List containing only the text excerpts that should be included
         """
-        if not texts:
-            return []
+        return self.filter_included_many([texts])[0]
+
+    def filter_included_many(self, documents, batch_size=None):
+        """Filter the excerpts of many documents at once.
 
-        exclude_predictions = self.predict_batch(texts)
-        return [
-            text
-            for text, should_exclude in zip(texts, exclude_predictions)
-            if not should_exclude
-        ]
+        The excerpts of all the documents are classified together, in
+        predict_proba calls of up to batch_size excerpts, and the results are
+        split back per document.
+
+        Args:
+            documents (list): One list of text excerpts per document
+            batch_size (int, optional): Maximum number of excerpts per
+                predict_proba call, all of them at once if None
+
+        Returns:
+            list: For each document, the text excerpts that should be included
+        """
+        texts = [text for document in documents for text in document]
+        exclude_predictions = self.predict_batch(texts, batch_size)
+
+        included = []
+        start = 0
+        for document in documents:
+            document_predictions = exclude_predictions[start : start + len(document)]
+            start += len(document)
+            included.append(
+                [
+                    text
+                    for text, should_exclude in zip(document, document_predictions)
+                    if not should_exclude
+                ]
+            )
+        return included
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""
+Short-lived cache of the identity resolved from an access token.
+
+get_current_user runs on every authenticated request; caching the resolved
+user and advisor by user id and token lets most requests skip the database
+entirely. Entries are invalidated when the user changes. The optional shared
+disk tier lets the worker processes of one host share entries and
+invalidations; other hosts still see a change after at most the TTL.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import xxhash
+from cachetools import TTLCache
+from diskcache import Cache
+
+from app.config import app_config
+from app.models.schemas.user_schema import AuthenticatedUserSchema
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityCache:
+    """
+    Args:
+        ttl_seconds: How long a resolved identity is reused
+        max_entries: Maximum number of identities kept in memory
+        shared_dir: Directory of the shared disk tier, None to disable it
+    """
+
+    def __init__(
+        self, ttl_seconds: int, max_entries: int, shared_dir: Optional[str] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._local = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self.shared = None
+        if shared_dir:
+            self.shared = Cache(shared_dir)
+            self.shared.create_tag_index()
+        self._counters = {"hits": 0, "shared_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(user_id: int, token: str) -> str:
+        # The raw token is never stored
+        return f"{user_id}:{xxhash.xxh3_128_hexdigest(token)}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["size"] = len(self._local)
+        return counters
+
+    def get(self, user_id: int, token: str) -> Optional[AuthenticatedUserSchema]:
+        key = self._key(user_id, token)
+        with self._lock:
+            identity = self._local.get(key)
+            if identity is not None:
+                self._counters["hits"] += 1
+                return identity
+
+        if self.shared is not None:
+            try:
+                payload = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared identity cache lookup failed: {e}")
+                payload = None
+            if payload is not None:
+                identity = AuthenticatedUserSchema.model_validate_json(payload)
+                with self._lock:
+                    self._local[key] = identity
+                    self._counters["shared_hits"] += 1
+                return identity
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, user_id: int, token: str, identity: AuthenticatedUserSchema) -> None:
+        key = self._key(user_id, token)
+        with self._lock:
+            self._local[key] = identity
+        if self.shared is not None:
+            try:
+                self.shared.set(
+                    key,
+                    identity.model_dump_json(),
+                    expire=self.ttl_seconds,
+                    tag=str(user_id),
+                )
+            except Exception as e:
+                logger.warning(f"Shared identity cache store failed: {e}")
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Forget every cached identity of a user, whatever the token.
+        """
+        prefix = f"{user_id}:"
+        with self._lock:
+            for key in [key for key in self._local if key.startswith(prefix)]:
+                self._local.pop(key, None)
+        if self.shared is not None:
+            try:
+                self.shared.evict(str(user_id))
+            except Exception as e:
+                logger.warning(f"Shared identity cache invalidation failed: {e}")
+
+
+identity_cache = IdentityCache(
+    ttl_seconds=app_config.IDENTITY_CACHE_TTL_SECONDS,
+    max_entries=app_config.IDENTITY_CACHE_MAX_ENTRIES,
+    shared_dir=app_config.IDENTITY_CACHE_DIR or None,
+)
@@ -0,0 +1,63 @@
+"""
+Cache of LLM completions keyed by a fingerprint of the request.
+
+The key covers the provider, model, messages, temperature and the JSON schema
+of the response format, plus a fingerprint of the extraction prompt so that
+editing the prompt invalidates every cached extraction.
+"""
+
+import json
+from typing import Any, Dict, Optional, Type
+
+from openai.types.chat import ChatCompletion, ParsedChatCompletion
+from pydantic import BaseModel
+
+from app.config import app_config
+from app.services.prompts import INVESTMENT_STATEMENT_DATA_EXTRACTION
+from app.services.result_cache import ResultCache, content_hash
+
+PROMPT_FINGERPRINT = content_hash(
+    json.dumps(INVESTMENT_STATEMENT_DATA_EXTRACTION, sort_keys=True)
+)
+
+llm_cache = ResultCache(
+    namespace="llm",
+    disk_dir=app_config.LLM_CACHE_DIR,
+    disk_size_limit=app_config.LLM_CACHE_DISK_SIZE_MB * 1024 * 1024,
+    ttl_seconds=app_config.LLM_CACHE_TTL_SECONDS,
+    max_db_entries=app_config.LLM_CACHE_MAX_DB_ENTRIES,
+    use_db=app_config.LLM_CACHE_DB_ENABLED,
+)
+
+
+def completion_cache_key(
+    provider: str,
+    completion_params: Dict[str, Any],
+    response_format: Type[BaseModel] | None,
+) -> str:
+    schema = (
+        json.dumps(response_format.model_json_schema(), sort_keys=True)
+        if response_format
+        else ""
+    )
+    params = json.dumps(completion_params, sort_keys=True, default=str)
+    return content_hash(provider, PROMPT_FINGERPRINT, params, schema)
+
+
+async def get_cached_completion(
+    key: str, response_format: Type[BaseModel] | None
+) -> Optional[Any]:
+    """
+    Return the cached completion, with the parsed response rebuilt as an
+    instance of response_format, or None on a miss.
+    """
+    payload = await llm_cache.aget(key)
+    if payload is None:
+        return None
+    if response_format:
+        return ParsedChatCompletion[response_format].model_validate_json(payload)
+    return ChatCompletion.model_validate_json(payload)
+
+
+async def cache_completion(key: str, completion: Any) -> None:
+    await llm_cache.aset(key, completion.model_dump_json().encode("utf-8"))
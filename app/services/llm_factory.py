@@ -1,7 +1,19 @@
 from openai import AsyncAzureOpenAI
 from pydantic import BaseModel
-from typing import List, Dict, Type, Any
+from typing import Any, Awaitable, Callable, Dict, List, Type
 from app.config import app_config
+from app.services.stage_limiter import llm_limiter
+from app.services.llm_resilience import (
+    StreamInterruptedError,
+    estimate_tokens,
+    is_retryable,
+    llm_caller,
+)
+from app.services.llm_cache import (
+    completion_cache_key,
+    get_cached_completion,
+    cache_completion,
+)
 from openai import AsyncOpenAI
 
 
@@ -13,14 +25,18 @@ class LlmFactory:
     def _initialize_client(self) -> Any:
         assert self.provider in ["azure-openai", "local-lm-studio"]
         if self.provider == "azure-openai":
+            # Retries are done by llm_caller, which shares their state
             return AsyncAzureOpenAI(
                 api_key=app_config.AZURE_OPENAI_API_KEY,
                 azure_endpoint=app_config.AZURE_OPENAI_ENDPOINT,
                 api_version="2024-08-01-preview",
+                max_retries=0,
             )
         elif self.provider == "local-lm-studio":
             return AsyncOpenAI(
-                base_url="http://127.0.0.1:1234/v1", api_key="not-needed"
+                base_url="http://127.0.0.1:1234/v1",
+                api_key="not-needed",
+                max_retries=0,
             )
 
     async def create_completion(
@@ -28,6 +44,7 @@ class LlmFactory:
         model: str,
         messages: List[Dict[str, str]],
         response_format: Type[BaseModel] | None = None,
+        use_cache: bool = app_config.LLM_CACHE_ENABLED,
         **kwargs,
     ) -> Any:
         completion_params = {
@@ -36,12 +53,102 @@ class LlmFactory:
             "messages": messages,
             "logprobs": True,
         }
+        cache_key = None
+        if use_cache:
+            cache_key = completion_cache_key(
+                self.provider, completion_params, response_format
+            )
+            completion = await get_cached_completion(cache_key, response_format)
+            if completion is not None:
+                return completion
+
         if response_format:
             completion_params["response_format"] = response_format
-            return await self.client.beta.chat.completions.parse(
-                **completion_params
+            create = self.client.beta.chat.completions.parse
+        else:
+            create = self.client.chat.completions.create
+
+        async def attempt() -> Any:
+            async with llm_limiter.slot():
+                return await create(
+                    **completion_params, timeout=llm_caller.timeout_seconds
+                )
+
+        completion = await llm_caller.call(
+            attempt, estimated_tokens=self._estimate_tokens(messages, **kwargs)
+        )
+
+        if cache_key:
+            await cache_completion(cache_key, completion)
+        return completion
+
+    async def stream_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        response_format: Type[BaseModel],
+        on_delta: Callable[[str], Awaitable[None]],
+        use_cache: bool = app_config.LLM_CACHE_ENABLED,
+        **kwargs,
+    ) -> Any:
+        """
+        Like create_completion with a response_format, but on_delta is
+        awaited with each piece of the response content as it is generated.
+        A cached completion is passed to on_delta in one piece.
+
+        Returns:
+            The parsed completion, once the response is complete
+        """
+        completion_params = {
+            "model": model,
+            "temperature": kwargs.get("temperature", 0.2),
+            "messages": messages,
+            "logprobs": True,
+        }
+        cache_key = None
+        if use_cache:
+            cache_key = completion_cache_key(
+                self.provider, completion_params, response_format
             )
-        return await self.client.chat.completions.create(**completion_params)
+            completion = await get_cached_completion(cache_key, response_format)
+            if completion is not None:
+                await on_delta(completion.choices[0].message.content)
+                return completion
+
+        async def attempt() -> Any:
+            streamed = False
+            async with llm_limiter.slot():
+                try:
+                    async with self.client.beta.chat.completions.stream(
+                        **completion_params,
+                        response_format=response_format,
+                        timeout=llm_caller.timeout_seconds,
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content.delta":
+                                streamed = True
+                                await on_delta(event.delta)
+                        return await stream.get_final_completion()
+                except Exception as e:
+                    # A retry would replay the content already handed out
+                    if streamed and is_retryable(e):
+                        raise StreamInterruptedError(str(e)) from e
+                    raise
+
+        completion = await llm_caller.call(
+            attempt, estimated_tokens=self._estimate_tokens(messages, **kwargs)
+        )
+
+        if cache_key:
+            await cache_completion(cache_key, completion)
+        return completion
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, str]], **kwargs) -> int:
+        return estimate_tokens(
+            "".join(message["content"] for message in messages),
+            kwargs.get("max_tokens", app_config.LLM_EXPECTED_OUTPUT_TOKENS),
+        )
 
 
 if __name__ == "__main__":
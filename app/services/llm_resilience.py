@@ -0,0 +1,351 @@
+"""
+Resilient call layer for the LLM service.
+
+Every completion request of the process goes through one ResilientLlmCaller
+(``llm_caller``), which shares between all callers:
+
+- token buckets limiting requests and tokens per minute on the client side,
+  paused for everyone when the service answers 429 with a retry-after hint,
+- jittered exponential backoff, stretched to the server's retry-after hint,
+- a circuit breaker failing calls fast while the service keeps failing.
+
+Per-attempt timeouts are applied by the caller of ``call`` (the OpenAI client
+takes a timeout per request).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from app.config import app_config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Rough size of a token in characters, used to estimate a request's tokens
+CHARS_PER_TOKEN = 4
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the service while the circuit breaker is open.
+    """
+
+
+class StreamInterruptedError(Exception):
+    """
+    Raised when a streamed completion fails on a transient error after part
+    of it was delivered. It counts as a failure of the service, but isn't
+    retried: a retry would replay the content already handed out.
+    """
+
+
+def estimate_tokens(text: str, max_output_tokens: int) -> int:
+    return len(text) // CHARS_PER_TOKEN + max_output_tokens
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether an error is transient: timeouts, connection errors, 408, 409,
+    429 and 5xx responses.
+    """
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return isinstance(error, asyncio.TimeoutError)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    The delay the service asked for in the retry-after(-ms) headers of a
+    failed response, if any.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date retry-after values are not used by the OpenAI endpoints
+        return None
+    return None
+
+
+class TokenBucket:
+    """
+    Allows up to per_minute units per minute, refilled continuously. A
+    per_minute of 0 disables the bucket.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = float(per_minute)
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def delay(self, amount: int) -> float:
+        """
+        Seconds until amount units are available, 0 if they are.
+        """
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: int) -> None:
+        if self.capacity:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount: int) -> None:
+        """
+        Correct an estimate once the actual usage is known; a negative amount
+        takes the difference.
+        """
+        if self.capacity:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    Requests per minute and tokens per minute buckets, served in arrival
+    order.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait until a request of tokens tokens is allowed.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start_time = time.monotonic()
+        async with self._lock:
+            while True:
+                delay = max(
+                    self._paused_until - time.monotonic(),
+                    self.requests.delay(1),
+                    self.tokens.delay(tokens),
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        return time.monotonic() - start_time
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures. While open, calls
+    fail fast; after reset_seconds a single trial call is let through and
+    closes the circuit again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError("LLM service circuit breaker is open")
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def cancel_trial(self) -> None:
+        """
+        Let another call try if the trial call was cancelled.
+        """
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(
+                    f"Opening the LLM circuit breaker after {self.failures} failures"
+                )
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+class ResilientLlmCaller:
+    """
+    Args:
+        requests_per_minute: Client-side request rate limit, 0 for none
+        tokens_per_minute: Client-side token rate limit, 0 for none
+        timeout_seconds: Timeout of one attempt
+        max_attempts: Attempts per call, including the first one
+        backoff_max_seconds: Upper bound of the exponential backoff
+        failure_threshold: Consecutive failures opening the circuit breaker
+        reset_seconds: How long the circuit breaker stays open
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        timeout_seconds: float,
+        max_attempts: int,
+        backoff_max_seconds: float,
+        failure_threshold: int,
+        reset_seconds: float,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self._backoff = wait_random_exponential(multiplier=1, max=backoff_max_seconds)
+        self._counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "rate_limited": 0,
+            "circuit_rejections": 0,
+            "throttle_wait_seconds": 0.0,
+        }
+
+    def stats(self) -> dict:
+        return {**self._counters, "circuit": self.breaker.state}
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        backoff = self._backoff(retry_state)
+        hint = retry_after_seconds(retry_state.outcome.exception())
+        return max(backoff, hint) if hint is not None else backoff
+
+    def _before_sleep(self, retry_state: RetryCallState) -> None:
+        self._counters["retries"] += 1
+        logger.warning(
+            f"LLM call failed ({retry_state.outcome.exception()!r}), retrying "
+            f"in {retry_state.next_action.sleep:.1f}s"
+        )
+
+    async def call(
+        self, request: Callable[[], Awaitable[T]], estimated_tokens: int
+    ) -> T:
+        """
+        Run request, retrying transient failures.
+
+        Args:
+            request: Makes one attempt, applying timeout_seconds
+            estimated_tokens: Tokens the request is expected to use, corrected
+                with the usage reported in the response
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+        """
+        self._counters["calls"] += 1
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self._wait,
+            retry=retry_if_exception(is_retryable),
+            before_sleep=self._before_sleep,
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                try:
+                    self.breaker.before_call()
+                except CircuitOpenError:
+                    self._counters["circuit_rejections"] += 1
+                    raise
+                self._counters["throttle_wait_seconds"] += (
+                    await self.rate_limiter.acquire(estimated_tokens)
+                )
+                self._counters["attempts"] += 1
+                try:
+                    result = await request()
+                except Exception as e:
+                    if is_retryable(e) or isinstance(e, StreamInterruptedError):
+                        self._record_failure(e)
+                    else:
+                        # The service answered, the request itself is wrong
+                        self.breaker.record_success()
+                    raise
+                except BaseException:
+                    self.breaker.cancel_trial()
+                    raise
+                self.breaker.record_success()
+                usage = getattr(result, "usage", None)
+                if usage is not None and usage.total_tokens is not None:
+                    self.rate_limiter.tokens.give_back(
+                        estimated_tokens - usage.total_tokens
+                    )
+                return result
+
+    def _record_failure(self, error: Exception) -> None:
+        self._counters["failures"] += 1
+        if not isinstance(error, openai.RateLimitError):
+            self.breaker.record_failure()
+            return
+        # Throttling is not an outage: leave the failure count alone (a trial
+        # call lets the next call try again), but hold back every caller, not
+        # only the one that got the 429
+        self.breaker.cancel_trial()
+        self._counters["rate_limited"] += 1
+        hint = retry_after_seconds(error)
+        if hint is not None:
+            self.rate_limiter.pause(hint)
+
+
+llm_caller = ResilientLlmCaller(
+    requests_per_minute=app_config.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=app_config.LLM_TOKENS_PER_MINUTE,
+    timeout_seconds=app_config.LLM_TIMEOUT_SECONDS,
+    max_attempts=app_config.LLM_MAX_ATTEMPTS,
+    backoff_max_seconds=app_config.LLM_BACKOFF_MAX_SECONDS,
+    failure_threshold=app_config.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    reset_seconds=app_config.LLM_CIRCUIT_RESET_SECONDS,
+)
@@ -0,0 +1,139 @@
+"""
+Process-wide registry of the pickled classifier models.
+
+Each model is loaded once per process and shared by every request. Loaded
+models are only used for inference, which is safe to run from several
+threads at once. When the file on disk changes the model is reloaded and
+swapped in; requests already holding the old model finish with it.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import joblib
+import psutil
+
+from app.config import app_config
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE_RELEVANCE_MODEL_PATH = os.path.join(
+    MODELS_DIR, "page_relevance_classifier.joblib"
+)
+EXCERPT_FILTER_MODEL_PATH = os.path.join(MODELS_DIR, "svm_filter_pipeline.pkl")
+EXCERPT_RELEVANCE_MODEL_PATH = os.path.join(
+    MODELS_DIR, "excerpt_relevance_classifier.joblib"
+)
+
+# Models used by the statement processing pipeline
+PIPELINE_MODEL_PATHS = [PAGE_RELEVANCE_MODEL_PATH, EXCERPT_FILTER_MODEL_PATH]
+
+
+@dataclass
+class LoadedModel:
+    model: Any
+    mtime: float
+    loaded_at: float
+    load_time_seconds: float
+    memory_bytes: int
+    load_count: int
+    checked_at: float
+
+
+class ModelRegistry:
+    """
+    Loads models lazily (or up front with preload) and caches them by path.
+
+    Args:
+        hot_reload: Reload a model when its file modification time changes
+        check_interval: Minimum number of seconds between file checks
+    """
+
+    def __init__(
+        self,
+        hot_reload: bool = app_config.MODEL_HOT_RELOAD,
+        check_interval: float = app_config.MODEL_RELOAD_CHECK_SECONDS,
+    ):
+        self.hot_reload = hot_reload
+        self.check_interval = check_interval
+        self._models: dict[str, LoadedModel] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Any:
+        """
+        Return the model stored at path, loading or reloading it if needed.
+        """
+        path = os.path.abspath(path)
+        entry = self._models.get(path)
+        if entry is not None and not self._is_stale(path, entry):
+            return entry.model
+        return self._load(path).model
+
+    def preload(self, paths: Optional[list[str]] = None) -> None:
+        for path in paths or PIPELINE_MODEL_PATHS:
+            self.get(path)
+
+    def stats(self) -> dict:
+        return {
+            os.path.basename(path): {
+                "load_time_seconds": entry.load_time_seconds,
+                "memory_bytes": entry.memory_bytes,
+                "loaded_at": int(entry.loaded_at),
+                "load_count": entry.load_count,
+            }
+            for path, entry in self._models.items()
+        }
+
+    def _is_stale(self, path: str, entry: LoadedModel) -> bool:
+        if not self.hot_reload:
+            return False
+        now = time.time()
+        if now - entry.checked_at < self.check_interval:
+            return False
+        entry.checked_at = now
+        try:
+            return os.path.getmtime(path) != entry.mtime
+        except OSError:
+            # Keep serving the loaded model while the file is being replaced
+            return False
+
+    def _load(self, path: str) -> LoadedModel:
+        with self._lock:
+            previous = self._models.get(path)
+            mtime = os.path.getmtime(path)
+            # Another thread may have loaded it while we waited for the lock
+            if previous is not None and previous.mtime == mtime:
+                return previous
+
+            process = psutil.Process()
+            rss_before = process.memory_info().rss
+            start_time = time.perf_counter()
+            with open(path, "rb") as f:
+                model = joblib.load(f)
+            load_time = time.perf_counter() - start_time
+            memory_bytes = max(process.memory_info().rss - rss_before, 0)
+
+            entry = LoadedModel(
+                model=model,
+                mtime=mtime,
+                loaded_at=time.time(),
+                load_time_seconds=load_time,
+                memory_bytes=memory_bytes,
+                load_count=previous.load_count + 1 if previous else 1,
+                checked_at=time.time(),
+            )
+            self._models[path] = entry
+
+        logger.info(
+            f"Loaded model {os.path.basename(path)} in {load_time:.3f}s "
+            f"(~{memory_bytes / 1024 / 1024:.1f} MB)"
+        )
+        return entry
+
+
+model_registry = ModelRegistry()
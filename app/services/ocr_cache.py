@@ -0,0 +1,56 @@
+"""
+Cache of Document Intelligence results keyed by the hash of the analyzed PDF.
+
+Advisors frequently re-upload the same statement; a cache hit skips the OCR
+round trip entirely.
+"""
+
+import json
+from typing import Optional
+
+from azure.ai.documentintelligence.models import AnalyzeResult
+
+from app.config import app_config
+from app.services.result_cache import ResultCache, content_hash
+
+# Bump when the OCR request (model, locale, output format) changes
+OCR_CACHE_VERSION = "prebuilt-layout:en-US:markdown:v1"
+
+ocr_cache = ResultCache(
+    namespace="ocr",
+    disk_dir=app_config.OCR_CACHE_DIR,
+    disk_size_limit=app_config.OCR_CACHE_DISK_SIZE_MB * 1024 * 1024,
+    ttl_seconds=app_config.OCR_CACHE_TTL_SECONDS,
+    max_db_entries=app_config.OCR_CACHE_MAX_DB_ENTRIES,
+    use_db=app_config.OCR_CACHE_DB_ENABLED,
+)
+
+
+def ocr_cache_key(provider: str, pdf_bytes: bytes) -> str:
+    return content_hash(provider, OCR_CACHE_VERSION, pdf_bytes)
+
+
+async def get_cached_analysis(
+    provider: str, pdf_bytes: bytes
+) -> Optional[AnalyzeResult]:
+    """
+    Return the cached analysis of the PDF, or None on a miss.
+    """
+    if not app_config.OCR_CACHE_ENABLED:
+        return None
+    payload = await ocr_cache.aget(ocr_cache_key(provider, pdf_bytes))
+    if payload is None:
+        return None
+    return AnalyzeResult(json.loads(payload))
+
+
+async def cache_analysis(
+    provider: str, pdf_bytes: bytes, result: AnalyzeResult
+) -> None:
+    """
+    Store the analysis of the PDF in the cache.
+    """
+    if not app_config.OCR_CACHE_ENABLED:
+        return
+    payload = json.dumps(result.as_dict()).encode("utf-8")
+    await ocr_cache.aset(ocr_cache_key(provider, pdf_bytes), payload)
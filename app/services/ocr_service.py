@@ -1,16 +1,19 @@
 from azure.core.exceptions import HttpResponseError
 from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
+from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
 from azure.ai.documentintelligence.models import (
-    AnalyzeDocumentRequest,
     ContentFormat,
     AnalyzeResult,
 )
 from app.config import app_config
+from app.services.stage_limiter import ocr_limiter
 from typing import Any
 import pandas as pd
-from functools import partial
 import asyncio
+import fitz
+
+# Separator Document Intelligence puts between pages in markdown content
+PAGE_BREAK = "\n<!-- PageBreak -->\n\n"
 
 
 def table_to_dataframe(table_data):
@@ -63,37 +66,155 @@ def doc_intel_to_df(result: AnalyzeResult) -> list[pd.DataFrame]:
     return df_list
 
 
-class OcrFactory:
-    def __init__(self, provider: str):
-        self.provider = provider
-        self.client = self._initialize_client()
+def split_pdf(pdf_bytes: bytes, pages_per_chunk: int) -> list[tuple[int, bytes]]:
+    """
+    Split a PDF into chunks of consecutive pages.
+
+    Args:
+        pdf_bytes: The raw bytes of the PDF
+        pages_per_chunk: Maximum number of pages in each chunk
+
+    Returns:
+        List of (index of the first page, chunk PDF bytes) in page order.
+        A document that fits in one chunk is returned as is.
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf:
+        page_count = pdf.page_count
+        if page_count <= pages_per_chunk:
+            return [(0, pdf_bytes)]
+
+        chunks = []
+        for start in range(0, page_count, pages_per_chunk):
+            end = min(start + pages_per_chunk, page_count) - 1
+            with fitz.open() as chunk:
+                chunk.insert_pdf(pdf, from_page=start, to_page=end)
+                chunks.append((start, chunk.tobytes()))
+    return chunks
+
+
+def _shift_analysis(
+    node: Any, page_offset: int, content_offset: int, element_offsets: dict
+) -> Any:
+    """
+    Shift page numbers, content spans and element references (e.g.
+    "/paragraphs/3") of a chunk's serialized analysis so they point into the
+    merged result.
+    """
+    if isinstance(node, list):
+        return [
+            _shift_analysis(item, page_offset, content_offset, element_offsets)
+            for item in node
+        ]
+    if not isinstance(node, dict):
+        return node
+
+    shifted = {}
+    for key, value in node.items():
+        if key == "pageNumber":
+            shifted[key] = value + page_offset
+        elif key == "offset" and "length" in node:
+            shifted[key] = value + content_offset
+        elif key == "elements":
+            shifted[key] = [
+                _shift_element_reference(reference, element_offsets)
+                for reference in value
+            ]
+        else:
+            shifted[key] = _shift_analysis(
+                value, page_offset, content_offset, element_offsets
+            )
+    return shifted
+
+
+def _shift_element_reference(reference: str, element_offsets: dict) -> str:
+    _, collection, index = reference.split("/")
+    return f"/{collection}/{int(index) + element_offsets.get(collection, 0)}"
+
 
-    def _initialize_client(self) -> Any:
-        assert self.provider in ["document-intelligence"]
-        if self.provider == "document-intelligence":
-            return DocumentIntelligenceClient(
+def merge_analyze_results(chunks: list[tuple[int, AnalyzeResult]]) -> AnalyzeResult:
+    """
+    Merge the analyses of consecutive page chunks into a single result, as if
+    the whole document had been analyzed at once.
+
+    Args:
+        chunks: List of (index of the chunk's first page, analysis) in page order
+
+    Returns:
+        AnalyzeResult: Pages, tables, paragraphs and other elements of every
+        chunk, with the markdown content concatenated in page order.
+    """
+    merged: dict = {}
+    content_parts = []
+    content_length = 0
+    element_offsets: dict = {}
+
+    for page_offset, result in chunks:
+        data = result.as_dict()
+        content = data.pop("content", "")
+        if content_parts:
+            content_parts.append(PAGE_BREAK)
+            content_length += len(PAGE_BREAK)
+
+        data = _shift_analysis(data, page_offset, content_length, element_offsets)
+        for key, value in data.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+                element_offsets[key] = element_offsets.get(key, 0) + len(value)
+            else:
+                merged.setdefault(key, value)
+
+        content_parts.append(content)
+        content_length += len(content)
+
+    merged["content"] = "".join(content_parts)
+    return AnalyzeResult(merged)
+
+
+# One async client (and connection pool) per provider, shared by every
+# OcrFactory in the process
+_clients: dict[str, Any] = {}
+
+
+def get_ocr_client(provider: str) -> Any:
+    assert provider in ["document-intelligence"]
+    client = _clients.get(provider)
+    if client is None:
+        if provider == "document-intelligence":
+            client = DocumentIntelligenceClient(
                 endpoint=app_config.DOC_INTEL_ENDPOINT,
                 credential=AzureKeyCredential(app_config.DOC_INTEL_API_KEY),
             )
+        _clients[provider] = client
+    return client
+
+
+async def close_ocr_clients() -> None:
+    """
+    Close the shared OCR clients and their connection pools.
+    """
+    while _clients:
+        _, client = _clients.popitem()
+        await client.close()
+
 
-    async def get_document_analysis(self, file_base64: str) -> AnalyzeResult:
-        # Run the blocking operations in a thread pool
-        loop = asyncio.get_running_loop()
+class OcrFactory:
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.client = get_ocr_client(provider)
+
+    async def get_document_analysis(self, pdf_bytes: bytes) -> AnalyzeResult:
         try:
-            # Run begin_analyze_document in thread pool
-            poller = await loop.run_in_executor(
-                None,
-                partial(
-                    self.client.begin_analyze_document,
+            async with ocr_limiter.slot():
+                poller = await self.client.begin_analyze_document(
                     "prebuilt-layout",
-                    AnalyzeDocumentRequest(bytes_source=file_base64),
+                    # Send the raw bytes instead of a base64 JSON body
+                    pdf_bytes,
+                    content_type="application/octet-stream",
                     locale="en-US",
                     output_content_format=ContentFormat.MARKDOWN,
-                ),
-            )
-
-            # Run poller.result() in thread pool
-            result: AnalyzeResult = await loop.run_in_executor(None, poller.result)
+                    polling_interval=app_config.OCR_POLL_INTERVAL_SECONDS,
+                )
+                result: AnalyzeResult = await poller.result()
 
         except HttpResponseError as error:
             if error.error is not None:
@@ -107,20 +228,50 @@ class OcrFactory:
             raise
         return result
 
+    async def get_document_analysis_chunked(
+        self,
+        pdf_bytes: bytes,
+        pages_per_chunk: int = app_config.OCR_CHUNK_PAGES,
+        max_concurrency: int = app_config.OCR_CHUNK_CONCURRENCY,
+    ) -> AnalyzeResult:
+        """
+        Analyze a PDF as page chunks submitted concurrently, then merge the
+        chunk results back into one result in page order.
 
-if __name__ == "__main__":
-    import base64
+        Args:
+            pdf_bytes: The raw bytes of the PDF
+            pages_per_chunk: Maximum number of pages sent in one request
+            max_concurrency: Maximum number of chunks analyzed at once
+        """
+        chunks = await asyncio.to_thread(split_pdf, pdf_bytes, pages_per_chunk)
+        if len(chunks) == 1:
+            return await self.get_document_analysis(pdf_bytes)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def analyze_chunk(chunk_bytes: bytes) -> AnalyzeResult:
+            async with semaphore:
+                return await self.get_document_analysis(chunk_bytes)
 
+        results = await asyncio.gather(
+            *(analyze_chunk(chunk_bytes) for _, chunk_bytes in chunks)
+        )
+        return merge_analyze_results(
+            [(start, result) for (start, _), result in zip(chunks, results)]
+        )
+
+
+if __name__ == "__main__":
     ocr_factory = OcrFactory("document-intelligence")
 
-    # Load a sample PDF file as base64
+    # Load a sample PDF file
     sample_file_path = (
         r"C:\Users\abden\Desktop\pdf_report_P_1515740_12-10-2024_lmqxH9t.pdf"
     )
     with open(sample_file_path, "rb") as file:
-        sample_base64 = base64.b64encode(file.read()).decode("utf-8")
+        sample_bytes = file.read()
 
-    result = asyncio.run(ocr_factory.get_document_analysis(sample_base64))
+    result = asyncio.run(ocr_factory.get_document_analysis(sample_bytes))
 
     print("Document analysis completed successfully.")
     print(f"Number of pages: {len(result.pages)}")
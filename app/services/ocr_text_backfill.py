@@ -0,0 +1,104 @@
+"""
+Regenerate the cleaned OCR text of the stored scans with the current
+excerpt filter model, e.g. after retraining it.
+
+The OCR text of many scans is classified at once (see
+remove_informational_text_many), so the backfill runs a few large
+predict_proba calls per batch of scans instead of one per scan. Run it with:
+    python -m app.services.ocr_text_backfill [--scans-per-batch 500]
+"""
+
+import argparse
+import logging
+import time
+from typing import Optional
+
+from app.models.database.ocr_text_db import (
+    get_ocr_texts_after,
+    update_ocr_texts_cleaned,
+)
+from app.services.model_registry import EXCERPT_FILTER_MODEL_PATH, model_registry
+from app.services.text_cleanup import remove_informational_text_many
+from app.utils.db_connection_manager import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_ocr_texts_cleaned(
+    scans_per_batch: int,
+    batch_size: Optional[int] = None,
+    after_scan_id: int = 0,
+    dry_run: bool = False,
+) -> int:
+    """
+    Recompute ocr_text_cleaned of every scan after after_scan_id, committing
+    after each batch of scans_per_batch scans.
+
+    Returns:
+        int: Number of scans processed
+    """
+    processed = 0
+    start_time = time.perf_counter()
+    while True:
+        with SessionLocal() as db:
+            texts = get_ocr_texts_after(db, after_scan_id, scans_per_batch)
+            if not texts:
+                break
+            cleaned_texts = remove_informational_text_many(
+                [text for _, text in texts], batch_size
+            )
+            if not dry_run:
+                update_ocr_texts_cleaned(
+                    db,
+                    [
+                        (scan_id, text, cleaned_text)
+                        for (scan_id, text), cleaned_text in zip(texts, cleaned_texts)
+                    ],
+                )
+                db.commit()
+
+        processed += len(texts)
+        after_scan_id = texts[-1][0]
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            f"Cleaned {processed} scans up to scan {after_scan_id} "
+            f"({processed / elapsed:.1f} scans/s)"
+        )
+    return processed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.ocr_text_backfill")
+    parser.add_argument(
+        "--scans-per-batch",
+        type=int,
+        default=500,
+        help="Scans loaded, classified and committed together",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Excerpts per predict_proba call "
+        "(default EXCERPT_CLASSIFIER_BATCH_SIZE)",
+    )
+    parser.add_argument(
+        "--after-scan-id",
+        type=int,
+        default=0,
+        help="Resume after this scan id",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Classify without saving"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    model_registry.preload([EXCERPT_FILTER_MODEL_PATH])
+    processed = backfill_ocr_texts_cleaned(
+        args.scans_per_batch, args.batch_size, args.after_scan_id, args.dry_run
+    )
+    logger.info(f"Done, {processed} scans processed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Two-tier, content-addressed cache for expensive processing results.
+
+Entries live in a local disk tier (diskcache) in front of a shared Postgres
+tier (the ``result_cache`` table). Payloads are opaque bytes, compressed with
+zlib before they are stored.
+"""
+
+import asyncio
+import logging
+import threading
+import zlib
+from typing import Optional
+
+import xxhash
+from diskcache import Cache
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.database.orm_models import CachedResult, utc_timestamp
+from app.utils.db_connection_manager import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(*parts: bytes | str) -> str:
+    """
+    Hash the given parts into a hex digest used as a cache key.
+    """
+    hasher = xxhash.xxh3_128()
+    for part in parts:
+        hasher.update(part.encode("utf-8") if isinstance(part, str) else part)
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache of compressed payloads keyed by content hash.
+
+    Args:
+        namespace: Separates unrelated results sharing the same storage
+        disk_dir: Directory of the local disk tier, None to disable it
+        disk_size_limit: Maximum size of the disk tier in bytes
+        ttl_seconds: Entries older than this are treated as misses and evicted
+        max_db_entries: Maximum number of entries kept in the Postgres tier
+        use_db: Whether to use the Postgres tier
+    """
+
+    # Run Postgres eviction every N stores
+    EVICTION_INTERVAL = 100
+
+    def __init__(
+        self,
+        namespace: str,
+        disk_dir: Optional[str],
+        disk_size_limit: int,
+        ttl_seconds: int,
+        max_db_entries: int,
+        use_db: bool = True,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self.use_db = use_db
+        self.disk = (
+            Cache(
+                disk_dir,
+                size_limit=disk_size_limit,
+                eviction_policy="least-recently-used",
+            )
+            if disk_dir
+            else None
+        )
+        self._lock = threading.Lock()
+        self._counters = {
+            "disk_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "errors": 0,
+        }
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["disk_hits"] + counters["db_hits"] + counters["misses"]
+        hits = counters["disk_hits"] + counters["db_hits"]
+        counters["hit_ratio"] = hits / lookups if lookups else 0.0
+        if self.disk is not None:
+            counters["disk_size_bytes"] = self.disk.volume()
+        return counters
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return the payload stored under key, or None on a miss.
+        """
+        try:
+            payload = self._get_disk(key)
+            if payload is not None:
+                self._count("disk_hits")
+                return payload
+
+            payload = self._get_db(key)
+            if payload is not None:
+                self._count("db_hits")
+                if self.disk is not None:
+                    self.disk.set(key, payload, expire=self.ttl_seconds)
+                return zlib.decompress(payload)
+        except Exception as e:
+            # A broken cache must never break processing
+            logger.warning(f"Result cache lookup failed: {e}")
+            self._count("errors")
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        """
+        Store a payload under key in every enabled tier.
+        """
+        payload = zlib.compress(value)
+        try:
+            if self.disk is not None:
+                self.disk.set(key, payload, expire=self.ttl_seconds)
+            if self.use_db:
+                self._set_db(key, payload)
+            self._count("stores")
+        except Exception as e:
+            logger.warning(f"Result cache store failed: {e}")
+            self._count("errors")
+            return
+
+        if self.use_db and self._counters["stores"] % self.EVICTION_INTERVAL == 0:
+            self.evict()
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: bytes) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    def _get_disk(self, key: str) -> Optional[bytes]:
+        if self.disk is None:
+            return None
+        payload = self.disk.get(key)
+        return zlib.decompress(payload) if payload is not None else None
+
+    def _get_db(self, key: str) -> Optional[bytes]:
+        if not self.use_db:
+            return None
+        now = utc_timestamp()
+        with SessionLocal() as db:
+            entry = db.execute(
+                select(CachedResult).filter(
+                    CachedResult.namespace == self.namespace,
+                    CachedResult.key == key,
+                    CachedResult.created_at >= now - self.ttl_seconds,
+                )
+            ).scalar_one_or_none()
+            if entry is None:
+                return None
+            payload = entry.payload
+            db.execute(
+                update(CachedResult)
+                .where(CachedResult.id == entry.id)
+                .values(
+                    hit_count=CachedResult.hit_count + 1, last_accessed_at=now
+                )
+            )
+            db.commit()
+        return payload
+
+    def _set_db(self, key: str, payload: bytes) -> None:
+        now = utc_timestamp()
+        values = {
+            "payload": payload,
+            "size_bytes": len(payload),
+            "created_at": now,
+            "last_accessed_at": now,
+        }
+        stmt = insert(CachedResult).values(
+            namespace=self.namespace, key=key, **values
+        )
+        with SessionLocal() as db:
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["namespace", "key"], set_=values
+                )
+            )
+            db.commit()
+
+    def evict(self) -> int:
+        """
+        Delete expired entries and the least recently used entries beyond
+        max_db_entries from the Postgres tier. Returns the number removed.
+        """
+        now = utc_timestamp()
+        with SessionLocal() as db:
+            expired = db.execute(
+                delete(CachedResult).where(
+                    CachedResult.namespace == self.namespace,
+                    CachedResult.created_at < now - self.ttl_seconds,
+                )
+            ).rowcount
+            keep = (
+                select(CachedResult.id)
+                .filter(CachedResult.namespace == self.namespace)
+                .order_by(CachedResult.last_accessed_at.desc())
+                .limit(self.max_db_entries)
+            )
+            overflow = db.execute(
+                delete(CachedResult).where(
+                    CachedResult.namespace == self.namespace,
+                    CachedResult.id.not_in(keep),
+                )
+            ).rowcount
+            db.commit()
+        return expired + overflow
@@ -0,0 +1,181 @@
+"""
+Scan status notifications over Postgres LISTEN/NOTIFY.
+
+The processing pipeline publishes status changes with NOTIFY inside the
+transaction that writes them, so subscribers only hear about committed
+changes. Each API process runs a single listener connection that fans the
+notifications out to in-process subscribers (the SSE status streams), so
+waiting clients don't hold any pooled database connection.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.enums import ScanStatus
+from app.utils.db_connection_manager import engine
+
+logger = logging.getLogger(__name__)
+
+SCAN_STATUS_CHANNEL = "scan_status"
+
+# Pushed to every subscriber after the listener reconnects: notifications sent
+# while it was disconnected are lost, so the status has to be read again
+RESYNC_EVENT = "resync"
+
+
+NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, :payload)")
+
+
+def _notify_params(scan_id: int, status: ScanStatus, **extra) -> dict:
+    payload = json.dumps({"scan_id": scan_id, "status": status.value, **extra})
+    return {"channel": SCAN_STATUS_CHANNEL, "payload": payload}
+
+
+def publish_scan_status(
+    db: Session, scan_id: int, status: ScanStatus, **extra
+) -> None:
+    """
+    Queue a scan status notification, delivered when db's transaction commits.
+    """
+    db.execute(NOTIFY_STATEMENT, _notify_params(scan_id, status, **extra))
+
+
+async def apublish_scan_status(
+    db: AsyncSession, scan_id: int, status: ScanStatus, **extra
+) -> None:
+    """
+    Async version of publish_scan_status.
+    """
+    await db.execute(NOTIFY_STATEMENT, _notify_params(scan_id, status, **extra))
+
+
+class ScanStatusBroker:
+    """
+    Listens on the scan status channel and dispatches notifications to the
+    queues of the subscribers of each scan.
+    """
+
+    RECONNECT_DELAY_SECONDS = 5
+
+    def __init__(self):
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._connection: Optional[psycopg2.extensions.connection] = None
+        # Registered with add_reader, kept because a connection psycopg2 has
+        # marked closed no longer reports its fileno
+        self._fileno: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_listening(self) -> bool:
+        return self._connection is not None and not self._connection.closed
+
+    def stats(self) -> dict:
+        return {
+            "listening": self.is_listening,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+        }
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        try:
+            await asyncio.to_thread(self._connect)
+        except psycopg2.Error as e:
+            logger.warning(f"Scan status listener failed to connect: {e}")
+            self._schedule_reconnect()
+            return
+        self._add_reader()
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self._close()
+
+    @contextmanager
+    def subscribe(self, scan_id: int) -> Iterator[asyncio.Queue]:
+        """
+        Register a queue receiving the status events of a scan.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[scan_id].add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(scan_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[scan_id]
+
+    def _connect(self) -> None:
+        dsn = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        connection = psycopg2.connect(dsn)
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {SCAN_STATUS_CHANNEL};")
+        self._connection = connection
+
+    def _add_reader(self) -> None:
+        self._fileno = self._connection.fileno()
+        self._loop.add_reader(self._fileno, self._on_readable)
+
+    def _close(self) -> None:
+        if self._loop is not None and self._fileno is not None:
+            self._loop.remove_reader(self._fileno)
+        self._fileno = None
+        if self._connection is None:
+            return
+        self._connection.close()
+        self._connection = None
+
+    def _on_readable(self) -> None:
+        try:
+            self._connection.poll()
+        except psycopg2.Error as e:
+            logger.warning(f"Scan status listener lost its connection: {e}")
+            self._close()
+            self._schedule_reconnect()
+            return
+
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            try:
+                event = json.loads(notify.payload)
+            except ValueError:
+                logger.warning(f"Invalid scan status payload: {notify.payload}")
+                continue
+            for queue in self._subscribers.get(event.get("scan_id"), ()):
+                queue.put_nowait(event)
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self.is_listening:
+            await asyncio.sleep(self.RECONNECT_DELAY_SECONDS)
+            try:
+                await asyncio.to_thread(self._connect)
+            except psycopg2.Error as e:
+                logger.warning(f"Scan status listener reconnect failed: {e}")
+                continue
+            self._add_reader()
+            logger.info("Scan status listener reconnected")
+            for queues in self._subscribers.values():
+                for queue in queues:
+                    queue.put_nowait({"event": RESYNC_EVENT})
+
+
+scan_status_broker = ScanStatusBroker()
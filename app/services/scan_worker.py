@@ -0,0 +1,173 @@
+"""
+Durable scan processing queue.
+
+Uploaded scans are queued in the ``scans`` table with status UPLOADED. Workers
+claim them with SELECT ... FOR UPDATE SKIP LOCKED and hold a lease that a
+heartbeat renews while the pipeline runs. If a worker dies, its lease expires
+and the scan is claimed again by the next available worker.
+
+Run standalone workers (separate from the API tier) with:
+    python -m app.services.scan_worker
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from typing import Optional, Tuple
+from uuid import uuid4
+
+from app.config import app_config
+from app.models.database.scan_db import (
+    claim_next_scan,
+    renew_scan_lease,
+    release_failed_scan,
+    expire_abandoned_scans,
+    process_file,
+)
+from app.services.storage import download_statement_file
+from app.services.cpu_pool import start_cpu_pool, stop_cpu_pool
+from app.services.model_registry import model_registry
+from app.services.ocr_service import close_ocr_clients
+from app.utils.db_connection_manager import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class ScanWorkerPool:
+    """
+    A bounded pool of coroutines that claim and process queued scans.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = app_config.SCAN_WORKER_CONCURRENCY,
+        lease_seconds: int = app_config.SCAN_LEASE_SECONDS,
+        heartbeat_seconds: int = app_config.SCAN_HEARTBEAT_SECONDS,
+        poll_seconds: float = app_config.SCAN_POLL_SECONDS,
+        max_attempts: int = app_config.SCAN_MAX_ATTEMPTS,
+    ):
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def notify(self) -> None:
+        """
+        Wake idle workers so a freshly queued scan is picked up without
+        waiting for the next poll.
+        """
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        logger.info(
+            f"Starting scan worker {self.worker_id} with {self.concurrency} slots"
+        )
+        self._tasks = [
+            asyncio.create_task(self._run_slot()) for _ in range(self.concurrency)
+        ]
+
+    async def join(self) -> None:
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run_slot(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception:
+                logger.exception("Failed to claim a scan")
+                job = None
+
+            if job is None:
+                await self._wait_for_work()
+                continue
+
+            scan_id, blob_name = job
+            await self._process(scan_id, blob_name)
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+        except asyncio.TimeoutError:
+            await asyncio.to_thread(self._expire_abandoned)
+        self._wakeup.clear()
+
+    def _claim(self) -> Optional[Tuple[int, str]]:
+        with SessionLocal() as db:
+            db_scan = claim_next_scan(
+                db, self.worker_id, self.lease_seconds, self.max_attempts
+            )
+            if db_scan is None:
+                return None
+            return db_scan.id, db_scan.blob_name
+
+    def _renew(self, scan_id: int) -> bool:
+        with SessionLocal() as db:
+            return renew_scan_lease(db, scan_id, self.worker_id, self.lease_seconds)
+
+    def _release(self, scan_id: int) -> None:
+        with SessionLocal() as db:
+            release_failed_scan(db, scan_id, self.worker_id, self.max_attempts)
+
+    def _expire_abandoned(self) -> None:
+        with SessionLocal() as db:
+            expired = expire_abandoned_scans(db, self.max_attempts)
+        if expired:
+            logger.warning(f"Marked {expired} abandoned scans as errored")
+
+    async def _heartbeat(self, scan_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            if not await asyncio.to_thread(self._renew, scan_id):
+                logger.warning(f"Worker {self.worker_id} lost lease on {scan_id}")
+                return
+
+    async def _process(self, scan_id: int, blob_name: str) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(scan_id))
+        try:
+            await process_file(scan_id, await download_statement_file(blob_name))
+        except asyncio.CancelledError:
+            # Worker shutdown: leave the lease to expire so another worker
+            # picks the scan up.
+            raise
+        except Exception:
+            logger.exception(f"Failed to process scan {scan_id}")
+            await asyncio.to_thread(self._release, scan_id)
+        finally:
+            heartbeat.cancel()
+
+
+scan_worker_pool = ScanWorkerPool()
+
+
+async def run_worker() -> None:
+    await asyncio.to_thread(model_registry.preload)
+    await start_cpu_pool()
+    await scan_worker_pool.start()
+    try:
+        await scan_worker_pool.join()
+    finally:
+        await scan_worker_pool.stop()
+        await stop_cpu_pool()
+        await close_ocr_clients()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
@@ -0,0 +1,162 @@
+"""
+Concurrency limits for the external calls of the scan pipeline.
+
+Each stage (OCR, LLM) gets its own limiter so a burst of scans queues in
+front of the service instead of tripping its rate limits. The per-process
+limit is a semaphore. The optional global limit bounds the calls of every
+process sharing the database: a call holds one of N Postgres advisory locks
+(one database connection) while it runs.
+"""
+
+import asyncio
+import logging
+import time
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import app_config
+from app.utils.db_connection_manager import async_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _advisory_lock_class(name: str) -> int:
+    # pg_try_advisory_lock(int, int) takes signed 32-bit keys
+    key = zlib.crc32(f"stage_limiter:{name}".encode())
+    return key - 2**32 if key >= 2**31 else key
+
+
+class StageLimiter:
+    """
+    Args:
+        name: Name of the stage, also namespaces its advisory locks
+        limit: Maximum number of concurrent calls in this process
+        global_limit: Maximum number of concurrent calls across processes,
+            0 to disable the global limit
+        poll_seconds: How often a call waiting for a global slot retries
+    """
+
+    def __init__(
+        self, name: str, limit: int, global_limit: int = 0, poll_seconds: float = 0.5
+    ):
+        self.name = name
+        self.limit = limit
+        self.global_limit = global_limit
+        self.poll_seconds = poll_seconds
+        self._semaphore = asyncio.Semaphore(limit)
+        self._lock_class = _advisory_lock_class(name)
+        self._counters = {
+            "waiting": 0,
+            "in_flight": 0,
+            "acquired": 0,
+            "wait_seconds_total": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def stats(self) -> dict:
+        counters = dict(self._counters)
+        acquired = counters["acquired"]
+        counters["mean_wait_seconds"] = (
+            counters["wait_seconds_total"] / acquired if acquired else 0.0
+        )
+        return {
+            "limit": self.limit,
+            "global_limit": self.global_limit,
+            **counters,
+        }
+
+    async def _acquire_global_slot(self) -> AsyncConnection:
+        """
+        Hold one of the global_limit advisory locks of the stage, waiting
+        until one is free.
+        """
+        # Session-level advisory locks outlive transactions: in autocommit the
+        # connection doesn't sit idle in a transaction for the whole call,
+        # which idle_in_transaction_session_timeout would kill
+        connection = await async_engine.connect()
+        try:
+            connection = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            while True:
+                for slot in range(self.global_limit):
+                    locked = await connection.scalar(
+                        text("SELECT pg_try_advisory_lock(:lock_class, :slot)"),
+                        {"lock_class": self._lock_class, "slot": slot},
+                    )
+                    if locked:
+                        connection.info["stage_limiter_slot"] = slot
+                        return connection
+                await asyncio.sleep(self.poll_seconds)
+        except BaseException:
+            await connection.close()
+            raise
+
+    async def _release_global_slot(self, connection: AsyncConnection) -> None:
+        try:
+            await connection.execute(
+                text("SELECT pg_advisory_unlock(:lock_class, :slot)"),
+                {
+                    "lock_class": self._lock_class,
+                    "slot": connection.info.pop("stage_limiter_slot"),
+                },
+            )
+        except Exception as e:
+            # Closing the connection releases the lock anyway
+            logger.warning(f"Failed to release {self.name} slot: {e}")
+        finally:
+            await connection.close()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Wait for a free slot and hold it for the duration of the block.
+        """
+        start_time = time.perf_counter()
+        self._counters["waiting"] += 1
+        connection: Optional[AsyncConnection] = None
+        try:
+            await self._semaphore.acquire()
+            try:
+                if self.global_limit > 0:
+                    connection = await self._acquire_global_slot()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self._counters["waiting"] -= 1
+
+        wait_seconds = time.perf_counter() - start_time
+        self._counters["acquired"] += 1
+        self._counters["wait_seconds_total"] += wait_seconds
+        self._counters["max_wait_seconds"] = max(
+            self._counters["max_wait_seconds"], wait_seconds
+        )
+        self._counters["in_flight"] += 1
+        try:
+            yield
+        finally:
+            self._counters["in_flight"] -= 1
+            if connection is not None:
+                await self._release_global_slot(connection)
+            self._semaphore.release()
+
+
+ocr_limiter = StageLimiter(
+    "ocr",
+    limit=app_config.OCR_MAX_CONCURRENCY,
+    global_limit=app_config.OCR_GLOBAL_MAX_CONCURRENCY,
+)
+llm_limiter = StageLimiter(
+    "llm",
+    limit=app_config.LLM_MAX_CONCURRENCY,
+    global_limit=app_config.LLM_GLOBAL_MAX_CONCURRENCY,
+)
+
+
+def stage_limiter_stats() -> dict:
+    return {limiter.name: limiter.stats() for limiter in (ocr_limiter, llm_limiter)}
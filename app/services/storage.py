@@ -1,8 +1,14 @@
 from uuid import uuid4
+import base64
+from azure.storage.blob import BlobBlock, ContentSettings
 from azure.storage.blob.aio import BlobServiceClient
+from fastapi import UploadFile
 
 from app.config import app_config
 
+# Size of each staged block when streaming uploads to blob storage
+UPLOAD_BLOCK_SIZE = 4 * 1024 * 1024
+
 
 def generate_unique_blob_name(file_name: str) -> str:
     """
@@ -28,12 +34,15 @@ async def get_blob_service_client():
     return BlobServiceClient.from_connection_string(connection_string)
 
 
-async def upload_statement_file(file: bytes, file_name: str) -> str:
+async def upload_statement_file(file: UploadFile, file_name: str) -> str:
     """
-    Upload a file to Azure Blob Storage with a unique identifier.
+    Stream a file to Azure Blob Storage with a unique identifier.
+
+    The file is read and staged in UPLOAD_BLOCK_SIZE blocks which are committed
+    at the end, so only one block is held in memory at a time.
 
     Args:
-        file: The file content in bytes
+        file: The uploaded file, read in chunks
         file_name: Original file name
     Returns:
         str: The unique blob name used for storage
@@ -44,12 +53,43 @@ async def upload_statement_file(file: bytes, file_name: str) -> str:
         blob_client = client.get_container_client("statements").get_blob_client(
             unique_blob_name
         )
-        await blob_client.upload_blob(file)
+        block_list = []
+        while chunk := await file.read(UPLOAD_BLOCK_SIZE):
+            # Block ids must all have the same length within a blob
+            block_id = base64.b64encode(f"{len(block_list):08d}".encode()).decode()
+            await blob_client.stage_block(block_id=block_id, data=chunk)
+            block_list.append(BlobBlock(block_id=block_id))
+        await blob_client.commit_block_list(
+            block_list,
+            content_settings=ContentSettings(content_type=file.content_type),
+        )
 
     return unique_blob_name
 
 
+async def download_statement_file(blob_name: str) -> bytes:
+    """
+    Download a statement file from Azure Blob Storage.
+
+    Args:
+        blob_name: The unique blob name returned by upload_statement_file
+    Returns:
+        bytes: The file content
+    """
+    async with await get_blob_service_client() as client:
+        blob_client = client.get_container_client("statements").get_blob_client(
+            blob_name
+        )
+        stream = await blob_client.download_blob()
+        return await stream.readall()
+
+
 if __name__ == "__main__":
     import asyncio
+    from io import BytesIO
 
-    asyncio.run(upload_statement_file(b"test", "test.txt"))
+    asyncio.run(
+        upload_statement_file(
+            UploadFile(BytesIO(b"test"), filename="test.txt"), "test.txt"
+        )
+    )
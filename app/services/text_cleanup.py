@@ -2,15 +2,21 @@
 Orchestration of the text cleanup process
 """
 
+from typing import Optional
+
 from app.model_training.feature_extraction import (
     PageFeatureExtractor,
     ExcerptFeatureExtractor,
 )
 import fitz
-import base64
-from io import BytesIO
-import joblib
+from app.config import app_config
 from app.services.exerpt_classifier import ExerptClassifier
+from app.services.model_registry import (
+    model_registry,
+    PAGE_RELEVANCE_MODEL_PATH,
+    EXCERPT_FILTER_MODEL_PATH,
+    EXCERPT_RELEVANCE_MODEL_PATH,
+)
 
 
 class StatementExcerptClassifier:
@@ -24,10 +30,10 @@ class StatementExcerptClassifier:
             "excerpt",
         ], "Classification level must be either 'page' or 'excerpt'"
         if classification_level == "page":
-            self.classifier = joblib.load("./app/services/page_relevance_classifier.joblib")
+            self.classifier = model_registry.get(PAGE_RELEVANCE_MODEL_PATH)
             self.feature_extractor = PageFeatureExtractor()
         elif classification_level == "excerpt":
-            self.classifier = joblib.load("./app/services/excerpt_relevance_classifier.joblib")
+            self.classifier = model_registry.get(EXCERPT_RELEVANCE_MODEL_PATH)
             self.feature_extractor = ExcerptFeatureExtractor()
         self.items_loaded: bool = False
 
@@ -67,58 +73,67 @@ def remove_informational_text(markdown_text: str) -> str:
     """
     Remove the standard informational text from the markdown text
     """
-    model_config = {
-        'pipeline_path': "./app/services/svm_filter_pipeline.pkl"
-    }
+    return remove_informational_text_many([markdown_text])[0]
+
+
+def remove_informational_text_many(
+    markdown_texts: list[str], batch_size: Optional[int] = None
+) -> list[str]:
+    """
+    Remove the standard informational text from the markdown text of many
+    documents, classifying their paragraphs together in batches of
+    batch_size (EXCERPT_CLASSIFIER_BATCH_SIZE by default).
+    """
+    model_config = {"pipeline_path": EXCERPT_FILTER_MODEL_PATH}
     classifier = ExerptClassifier(model_config)
-    included_texts = classifier.filter_included(markdown_text.split("\n\n"))
+    included_texts = classifier.filter_included_many(
+        [markdown_text.split("\n\n") for markdown_text in markdown_texts],
+        batch_size or app_config.EXCERPT_CLASSIFIER_BATCH_SIZE,
+    )
 
     # Join the relevant paragraphs back into a single string
-    cleaned_text = "\n\n".join(included_texts)
-
-    return cleaned_text
+    return ["\n\n".join(paragraphs) for paragraphs in included_texts]
 
 
-def remove_disclaimer_pages(input_base64: str) -> str:
+def remove_disclaimer_pages(pdf_bytes: bytes) -> bytes:
     """
-    Remove disclaimer pages from the input base64-encoded PDF and return a new base64-encoded PDF.
+    Remove disclaimer pages from the input PDF and return a new PDF.
 
-    This function takes a base64-encoded PDF as input, processes it to identify and remove
-    disclaimer pages, and returns a new base64-encoded PDF containing only the relevant pages.
+    This function takes the raw bytes of a PDF as input, processes it to identify and
+    remove disclaimer pages, and returns a new PDF containing only the relevant pages.
+    When every page is relevant the input bytes are returned as is, without a copy.
 
     Args:
-        input_base64 (str): A base64-encoded string representing the input PDF.
+        pdf_bytes (bytes): The raw bytes of the input PDF.
 
     Returns:
-        str: A base64-encoded string representing the new PDF with disclaimer pages removed.
+        bytes: The raw bytes of the new PDF with disclaimer pages removed.
 
     Raises:
-        ValueError: If the input is not a valid base64-encoded PDF.
+        ValueError: If the input is not a valid PDF.
     """
     classifier = StatementExcerptClassifier(classification_level="page")
 
-    # Decode base64 to PDF bytes
-    pdf_bytes = base64.b64decode(input_base64)
-
     # Open the PDF from bytes
     pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
 
-    # Create a new PDF to store relevant pages
-    new_pdf = fitz.open()
     pages_str = [page.get_text() for page in pdf]
     classifier.load_document_items(pages_str)
     relevant_pages = classifier.get_relevant_items_index()
+    if len(relevant_pages) == len(pages_str):
+        pdf.close()
+        return pdf_bytes
+
+    # Create a new PDF to store relevant pages
+    new_pdf = fitz.open()
     for i in relevant_pages:
         new_pdf.insert_pdf(pdf, from_page=i, to_page=i)
-
-    # Convert the new PDF to base64
-    buffer = BytesIO()
-    new_pdf.save(buffer)
-    new_pdf_bytes = buffer.getvalue()
-    base64_pdf = base64.b64encode(new_pdf_bytes).decode()
+    # Without a new random trailer ID the same input always gives the same
+    # bytes, which the OCR cache is keyed on
+    new_pdf_bytes = new_pdf.tobytes(no_new_id=True)
 
     # Close both PDFs
     pdf.close()
     new_pdf.close()
 
-    return base64_pdf
+    return new_pdf_bytes
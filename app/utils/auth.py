@@ -5,9 +5,12 @@ from app.models.database.user_db import User, get_user
 from app.utils.hash import Hash
 from fastapi import HTTPException, status, Depends
 from app.config import app_config
-from app.utils.db_connection_manager import get_db
+from app.utils.db_connection_manager import SessionLocal
+from app.models.schemas.user_schema import AuthenticatedUserSchema
+from app.services.identity_cache import identity_cache
 from sqlalchemy.orm import Session
 from time import time
+import asyncio
 
 
 SECRET_KEY = app_config.AUTH_SECRET_KEY
@@ -24,10 +27,23 @@ credentials_exception = HTTPException(
 )
 
 
-def authenticate_user(email: str, password: str, db: Session) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not Hash.verify(hashed_password=user.password, plain_password=password):
+def _get_user_by_email(db: Session, email: str) -> User:
+    return db.query(User).filter(User.email == email).first()
+
+
+async def authenticate_user(email: str, password: str, db: Session) -> User:
+    """
+    Check the credentials, hashing on the bcrypt pool. When the stored hash
+    uses another cost factor than BCRYPT_ROUNDS it is replaced in the session;
+    the caller's next commit saves it.
+    """
+    user = await asyncio.to_thread(_get_user_by_email, db, email)
+    if not user or not await Hash.averify(
+        hashed_password=user.password, plain_password=password
+    ):
         raise credentials_exception
+    if Hash.needs_rehash(user.password):
+        user.password = await Hash.abcrypt(password)
     return user
 
 
@@ -75,10 +91,17 @@ def verify_token(token: str, token_type: str):
 
 
 def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)
-):
-    user_id = verify_token(token, "access")
-    user = get_user(db, int(user_id))
-    if user is None:
-        raise credentials_exception
-    return user
+    token: Annotated[str, Depends(oauth2_scheme)]
+) -> AuthenticatedUserSchema:
+    user_id = int(verify_token(token, "access"))
+    identity = identity_cache.get(user_id, token)
+    if identity is not None:
+        return identity
+
+    with SessionLocal() as db:
+        user = get_user(db, user_id)
+        if user is None:
+            raise credentials_exception
+        identity = AuthenticatedUserSchema.model_validate(user)
+    identity_cache.set(user_id, token, identity)
+    return identity
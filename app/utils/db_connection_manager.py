@@ -1,12 +1,25 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
+from typing import AsyncIterator
 from app.config import app_config
 
 
-engine = create_engine(
-    app_config.SQLALCHEMY_DATABASE_URI,
-    pool_size=10,
-    max_overflow=20,
+# Without a database URL (e.g. the offline benchmarks) there are no engines,
+# the sessions fail when used instead of the import failing
+engine = (
+    create_engine(
+        app_config.SQLALCHEMY_DATABASE_URI,
+        pool_size=10,
+        max_overflow=20,
+    )
+    if app_config.SQLALCHEMY_DATABASE_URI
+    else None
 )
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
@@ -20,6 +33,42 @@ def get_db():
         db.close()
 
 
+def async_database_url(database_uri: str) -> URL:
+    """
+    The database URL for the asyncpg driver, which takes ``ssl`` instead of
+    libpq's ``sslmode``.
+    """
+    url = make_url(database_uri).set(drivername="postgresql+asyncpg")
+    sslmode = url.query.get("sslmode")
+    if sslmode:
+        url = url.difference_update_query(["sslmode"]).update_query_dict(
+            {"ssl": sslmode}
+        )
+    return url
+
+
+# Used by the async API routes, so a slow query only suspends its own request
+async_engine = (
+    create_async_engine(
+        async_database_url(app_config.SQLALCHEMY_DATABASE_URI),
+        pool_size=10,
+        max_overflow=20,
+    )
+    if app_config.SQLALCHEMY_DATABASE_URI
+    else None
+)
+
+# Objects stay loaded after commit, async sessions can't lazy load on access
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 if __name__ == "__main__":
     from app.models.database import Client
 
@@ -1,10 +1,56 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+from app.config import app_config
+
+# bcrypt releases the GIL, so hashes run in parallel on this pool while the
+# event loop keeps serving requests. The pool bounds how many CPUs hashing
+# can take; extra requests wait in its queue.
+_executor = ThreadPoolExecutor(
+    max_workers=app_config.BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt"
+)
+_lock = threading.Lock()
+_counters = {"submitted": 0, "running": 0, "completed": 0}
+
+
+def _track(fn, *args):
+    with _lock:
+        _counters["running"] += 1
+    try:
+        return fn(*args)
+    finally:
+        with _lock:
+            _counters["running"] -= 1
+            _counters["completed"] += 1
+
+
+async def _run_in_executor(fn, *args):
+    with _lock:
+        _counters["submitted"] += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _track, fn, *args)
+
+
+def hash_executor_stats() -> dict:
+    with _lock:
+        counters = dict(_counters)
+    in_flight = counters["submitted"] - counters["completed"]
+    return {
+        "workers": app_config.BCRYPT_MAX_WORKERS,
+        "rounds": app_config.BCRYPT_ROUNDS,
+        "running": counters["running"],
+        "queue_depth": in_flight - counters["running"],
+        "completed": counters["completed"],
+    }
+
 
 class Hash:
-    def bcrypt(password: str) -> str:
+    def bcrypt(password: str) -> bytes:
         pwd_bytes = password.encode("utf-8")
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=app_config.BCRYPT_ROUNDS)
         hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
         return hashed_password
 
@@ -13,6 +59,25 @@ class Hash:
             password=plain_password.encode("utf-8"), hashed_password=hashed_password
         )
 
+    def needs_rehash(hashed_password: bytes) -> bool:
+        """
+        Whether the hash was made with a cost factor other than the configured one.
+        """
+        # Hashes look like $2b$12$<salt and hash>
+        return int(hashed_password.split(b"$")[2]) != app_config.BCRYPT_ROUNDS
+
+    async def abcrypt(password: str) -> bytes:
+        """
+        Hash the password on the bcrypt pool, without blocking the event loop.
+        """
+        return await _run_in_executor(Hash.bcrypt, password)
+
+    async def averify(hashed_password: bytes, plain_password: str) -> bool:
+        """
+        Verify the password on the bcrypt pool, without blocking the event loop.
+        """
+        return await _run_in_executor(Hash.verify, hashed_password, plain_password)
+
 
 if __name__ == "__main__":
     print(Hash.bcrypt("password"))
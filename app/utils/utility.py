@@ -81,35 +81,89 @@ def find_pdfs(directory):
     return pdf_paths
 
 
+# Figures with their content
+_FIGURE_PATTERN = re.compile(r"<figure>.*?</figure>", re.DOTALL)
+
+# Every other tag or comment except tables, page numbers and page footers.
+# The exceptions are only looked up after the characters they start with, the
+# common tags are matched without lookahead.
+_TAG_PATTERN = re.compile(
+    r"<(?:[^!t\d>]|t(?!able\b)|!(?!--\s*(?:PageNumber|PageFooter)=)|\d(?!\d* of \d+))"
+    r"[^>]*>"
+)
+
+# Page footers other than "n of m"
+_PAGE_FOOTER_PATTERN = re.compile(
+    r"<!--\s*PageFooter=\"(?!\d+ of \d+)[^\"]*\"\s*-->"
+)
+
+# A page footer still open at the end of the text
+_OPEN_PAGE_FOOTER_PATTERN = re.compile(r"<!--\s*PageFooter=\"[^\"]*(?:\"\s*)?\Z")
+
+# Links, including the [alt](src) of images, leaving their "!"
+_LINK_PATTERN = re.compile(r"\[.*?\]\(.*?\)")
+
+# URLs, matched once the links are gone, as "https://[a](b) " leaves "https:// "
+_URL_PATTERN = re.compile(r"https?://[!$-_a-z]+")
+
+
 def clean_markdown_text(ocr_text):
     """
-    Cleans markdown text from a PDF and removes duplicate lines.
+    Cleans markdown text from a PDF: removes figures, HTML tags and comments
+    (except tables, page numbers and "n of m" page footers), then links and
+    images, then URLs.
+
+    Each pass runs on the text left by the previous one, so a tag between
+    the parts of a link doesn't keep it from being removed.
+    """
+    cleaned_text = _FIGURE_PATTERN.sub("", ocr_text)
+    cleaned_text = _TAG_PATTERN.sub("", cleaned_text)
+    cleaned_text = _PAGE_FOOTER_PATTERN.sub("", cleaned_text)
+    cleaned_text = _LINK_PATTERN.sub("", cleaned_text)
+    return _URL_PATTERN.sub("", cleaned_text)
+
+
+class MarkdownCleaner:
+    """
+    Cleans markdown fed in pieces, such as pages as the OCR output streams
+    in. The concatenated output of feed and flush is clean_markdown_text of
+    the concatenated input.
     """
 
-    # Use regex to remove content between <figure> and </figure> tags, including the tags
-    cleaned_text = re.sub(r"<figure>.*?</figure>", "", ocr_text, flags=re.DOTALL)
-
-    # Remove inline HTML tags (except for tables, and page numbers)
-    cleaned_text = re.sub(
-        r"<(?!table\b|(?:\d+ of \d+)|!--\s*(?:PageNumber|PageFooter)=)[^>]+>",
-        "",
-        cleaned_text,
-    )
-    cleaned_text = re.sub(
-        r"<!--\s*PageFooter=\"(?!(\d+ of \d+))[^\"]*\"\s*-->", "", cleaned_text
-    )
-
-    # Remove links
-    cleaned_text = re.sub(r"\[.*?\]\(.*?\)", "", cleaned_text)
-
-    # Remove images
-    cleaned_text = re.sub(r"!\[.*?\]\(.*?\)", "", cleaned_text)
-
-    # Remove URLs
-    cleaned_text = re.sub(
-        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
-        "",
-        cleaned_text,
-    )
-
-    return cleaned_text
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        """
+        Returns:
+            str: The cleaned text that no later input can change
+        """
+        self._pending += text
+        cut = self._safe_cut()
+        if not cut:
+            return ""
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return clean_markdown_text(ready)
+
+    def flush(self) -> str:
+        ready, self._pending = self._pending, ""
+        return clean_markdown_text(ready)
+
+    def _safe_cut(self) -> int:
+        """
+        The last line end that no match can span. Links and URLs end at the
+        line end, so only an unclosed figure, tag or page footer can run past
+        it, the tag possibly starting before a figure that is removed first.
+        """
+        text = self._pending
+        cut = text.rfind("\n") + 1
+        while cut:
+            head = text[:cut]
+            if head.rfind("<figure>") <= head.rfind("</figure>"):
+                head = _FIGURE_PATTERN.sub("", head)
+                if head.rfind("<") <= head.rfind(">") and not (
+                    _OPEN_PAGE_FOOTER_PATTERN.search(_TAG_PATTERN.sub("", head))
+                ):
+                    return cut
+            cut = text.rfind("\n", 0, cut - 1) + 1
+        return 0
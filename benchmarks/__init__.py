@@ -0,0 +1,7 @@
+"""
+Offline benchmarks of the statement processing pipeline.
+
+Recorded OCR and LLM responses are replayed through local stand-ins, so the
+benchmarks run without Azure credentials or network access. See
+``python -m benchmarks --help``.
+"""
@@ -0,0 +1,329 @@
+"""
+Benchmark the statement processing pipeline against recorded fixtures.
+
+Usage:
+    python -m benchmarks run [--scans 50] [--concurrency 8] [--stream]
+                             [--baseline benchmarks/baseline.json]
+                             [--save-baseline]
+    python -m benchmarks record statement.pdf --name broker-monthly
+    python -m benchmarks cleaner [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from typing import Dict, List
+
+import psutil
+
+from app.config import app_config
+from app.services.cpu_pool import start_cpu_pool, stop_cpu_pool
+from benchmarks.cleaner import print_cleaner_report, run_cleaner_benchmark
+from benchmarks.replay import load_fixtures, record_fixture, replay_processor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, "fixtures")
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+STAGES = [
+    "remove_disclaimer_pages",
+    "ocr",
+    "clean_markdown_text",
+    "remove_informational_text",
+    "extraction",
+    "first_account",
+    "total",
+]
+PERCENTILES = [50, 95, 99]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of values.
+    """
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class RssSampler:
+    """
+    Samples the resident set size of the process and its children while the
+    benchmark runs.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_rss = 0
+        self._process = psutil.Process()
+        self._task = None
+
+    def _sample(self) -> None:
+        rss = self._process.memory_info().rss
+        # Include the CPU pool workers
+        for child in self._process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        self.peak_rss = max(self.peak_rss, rss)
+
+    async def _run(self) -> None:
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._sample()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> int:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._sample()
+        return self.peak_rss
+
+
+async def discard_account(account) -> None:
+    pass
+
+
+async def run_benchmark(
+    fixtures,
+    scans: int,
+    concurrency: int,
+    ocr_latency: float,
+    llm_latency: float,
+    stream: bool = False,
+) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    on_account = discard_account if stream else None
+
+    async def run_scan(index: int) -> None:
+        fixture = fixtures[index % len(fixtures)]
+        async with semaphore:
+            processor = replay_processor(fixture, ocr_latency, llm_latency)
+            start_time = time.perf_counter()
+            await processor.process_scan(fixture.pdf_bytes, on_account=on_account)
+            total = time.perf_counter() - start_time
+        for stage, seconds in processor.stage_timings.items():
+            timings[stage].append(seconds)
+        timings["total"].append(total)
+
+    # Warm up: start the CPU pool workers and run every fixture once
+    await start_cpu_pool()
+    for fixture in fixtures:
+        await replay_processor(fixture).process_scan(fixture.pdf_bytes)
+
+    sampler = RssSampler()
+    sampler.start()
+    start_time = time.perf_counter()
+    await asyncio.gather(*(run_scan(index) for index in range(scans)))
+    elapsed = time.perf_counter() - start_time
+    peak_rss = await sampler.stop()
+    await stop_cpu_pool()
+
+    return {
+        "fixtures": [fixture.name for fixture in fixtures],
+        "scans": scans,
+        "concurrency": concurrency,
+        "ocr_latency": ocr_latency,
+        "llm_latency": llm_latency,
+        "stream": stream,
+        "elapsed_seconds": elapsed,
+        "throughput_scans_per_second": scans / elapsed,
+        "peak_rss_bytes": peak_rss,
+        "latency": {
+            stage: {
+                **{f"p{pct}": percentile(values, pct) for pct in PERCENTILES},
+                "mean": sum(values) / len(values),
+            }
+            for stage, values in timings.items()
+            if values
+        },
+    }
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Return a description of every metric worse than the baseline by more than
+    tolerance (a fraction).
+    """
+    regressions = []
+
+    def check(metric: str, current: float, previous: float, higher_is_better=False):
+        if not previous:
+            return
+        change = (current - previous) / previous
+        if higher_is_better:
+            change = -change
+        if change > tolerance:
+            regressions.append(
+                f"{metric}: {previous:.4g} -> {current:.4g} ({change:+.1%} worse)"
+            )
+
+    check(
+        "throughput_scans_per_second",
+        report["throughput_scans_per_second"],
+        baseline.get("throughput_scans_per_second"),
+        higher_is_better=True,
+    )
+    check("peak_rss_bytes", report["peak_rss_bytes"], baseline.get("peak_rss_bytes"))
+    for stage, stats in report["latency"].items():
+        previous_stats = baseline.get("latency", {}).get(stage, {})
+        for pct in PERCENTILES:
+            key = f"p{pct}"
+            check(f"{stage}.{key}", stats[key], previous_stats.get(key))
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"{report['scans']} scans of {len(report['fixtures'])} fixture(s) "
+        f"at concurrency {report['concurrency']}"
+    )
+    print(f"Throughput: {report['throughput_scans_per_second']:.2f} scans/s")
+    print(f"Peak RSS:   {report['peak_rss_bytes'] / 1024 / 1024:.1f} MB")
+    print()
+    header = "".join(f"{f'p{pct} (ms)':>12}" for pct in PERCENTILES)
+    print(f"{'stage':<28}{header}{'mean (ms)':>12}")
+    for stage, stats in report["latency"].items():
+        row = "".join(f"{stats[f'p{pct}'] * 1000:>12.1f}" for pct in PERCENTILES)
+        print(f"{stage:<28}{row}{stats['mean'] * 1000:>12.1f}")
+
+
+def find_fixtures(fixtures_dir: str) -> list:
+    fixtures = []
+    if os.path.isdir(fixtures_dir):
+        fixtures = load_fixtures(fixtures_dir)
+    if not fixtures:
+        print(f"No fixtures found in {fixtures_dir}, record some first")
+    return fixtures
+
+
+def run(args: argparse.Namespace) -> int:
+    fixtures = find_fixtures(args.fixtures_dir)
+    if not fixtures:
+        return 2
+
+    # Replay must never reach the caches
+    app_config.OCR_CACHE_ENABLED = False
+    app_config.LLM_STREAMING_EXTRACTION = args.stream
+    report = asyncio.run(
+        run_benchmark(
+            fixtures,
+            args.scans,
+            args.concurrency,
+            args.ocr_latency,
+            args.llm_latency,
+            stream=args.stream,
+        )
+    )
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+def record(args: argparse.Namespace) -> int:
+    name = args.name or os.path.splitext(os.path.basename(args.pdf_path))[0]
+    fixture_dir = asyncio.run(record_fixture(args.pdf_path, args.fixtures_dir, name))
+    print(f"Recorded fixture in {fixture_dir}")
+    return 0
+
+
+def cleaner(args: argparse.Namespace) -> int:
+    fixtures = find_fixtures(args.fixtures_dir)
+    if not fixtures:
+        return 2
+    report = run_cleaner_benchmark(fixtures, args.repeat)
+    print_cleaner_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    identical = all(
+        result["identical"] and result["incremental_identical"]
+        for result in report["fixtures"]
+    )
+    return 0 if identical else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--fixtures-dir", default=DEFAULT_FIXTURES_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Replay the recorded fixtures")
+    run_parser.add_argument("--scans", type=int, default=50)
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument(
+        "--ocr-latency", type=float, default=0.0, help="Simulated OCR seconds"
+    )
+    run_parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="Simulated LLM seconds"
+    )
+    run_parser.add_argument(
+        "--stream", action="store_true", help="Use the streaming extraction"
+    )
+    run_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    run_parser.add_argument(
+        "--save-baseline", action="store_true", help="Store this run as baseline"
+    )
+    run_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed slowdown against the baseline, as a fraction",
+    )
+    run_parser.add_argument("--output", help="Write the report as JSON")
+    run_parser.set_defaults(handler=run)
+
+    record_parser = subparsers.add_parser(
+        "record", help="Record a fixture from the live services"
+    )
+    record_parser.add_argument("pdf_path")
+    record_parser.add_argument("--name")
+    record_parser.set_defaults(handler=record)
+
+    cleaner_parser = subparsers.add_parser(
+        "cleaner",
+        help="Compare clean_markdown_text with the previous implementation",
+    )
+    cleaner_parser.add_argument("--repeat", type=int, default=20)
+    cleaner_parser.add_argument("--output", help="Write the report as JSON")
+    cleaner_parser.set_defaults(handler=cleaner)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
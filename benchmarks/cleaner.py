@@ -0,0 +1,115 @@
+"""
+Equivalence and speed of clean_markdown_text against the chained re.sub
+implementation it replaced, on the OCR output of the recorded fixtures.
+
+The markdown is also fed to MarkdownCleaner one page at a time, as the
+pages of a statement come out of the OCR, and must clean to the same text.
+"""
+
+import json
+import re
+import time
+from typing import Dict, List
+
+from app.utils.utility import MarkdownCleaner, clean_markdown_text
+from benchmarks.replay import Fixture
+
+
+def legacy_clean_markdown_text(ocr_text: str) -> str:
+    """
+    The cleaner as it was before the patterns were precompiled and simplified,
+    kept as the reference output.
+    """
+    cleaned_text = re.sub(r"<figure>.*?</figure>", "", ocr_text, flags=re.DOTALL)
+    cleaned_text = re.sub(
+        r"<(?!table\b|(?:\d+ of \d+)|!--\s*(?:PageNumber|PageFooter)=)[^>]+>",
+        "",
+        cleaned_text,
+    )
+    cleaned_text = re.sub(
+        r"<!--\s*PageFooter=\"(?!(\d+ of \d+))[^\"]*\"\s*-->", "", cleaned_text
+    )
+    cleaned_text = re.sub(r"\[.*?\]\(.*?\)", "", cleaned_text)
+    cleaned_text = re.sub(r"!\[.*?\]\(.*?\)", "", cleaned_text)
+    cleaned_text = re.sub(
+        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
+        "",
+        cleaned_text,
+    )
+    return cleaned_text
+
+
+def ocr_pages(ocr_payload: Dict) -> List[str]:
+    """
+    Split the OCR markdown into the spans of its pages, the text between them
+    going with the next page.
+    """
+    content = ocr_payload.get("content", "")
+    pages = []
+    start = 0
+    for page in ocr_payload.get("pages", []):
+        spans = page.get("spans") or []
+        if not spans:
+            continue
+        end = max(span["offset"] + span["length"] for span in spans)
+        pages.append(content[start:end])
+        start = end
+    pages.append(content[start:])
+    return pages
+
+
+def clean_incrementally(pages: List[str]) -> str:
+    cleaner = MarkdownCleaner()
+    return "".join(cleaner.feed(page) for page in pages) + cleaner.flush()
+
+
+def best_time(function, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function(text)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def run_cleaner_benchmark(fixtures: List[Fixture], repeat: int) -> Dict:
+    results = []
+    for fixture in fixtures:
+        ocr_payload = json.loads(fixture.ocr_payload)
+        content = ocr_payload.get("content", "")
+        expected = legacy_clean_markdown_text(content)
+        results.append(
+            {
+                "fixture": fixture.name,
+                "chars": len(content),
+                "identical": clean_markdown_text(content) == expected,
+                "incremental_identical": (
+                    clean_incrementally(ocr_pages(ocr_payload)) == expected
+                ),
+                "legacy_seconds": best_time(
+                    legacy_clean_markdown_text, content, repeat
+                ),
+                "seconds": best_time(clean_markdown_text, content, repeat),
+            }
+        )
+    return {"repeat": repeat, "fixtures": results}
+
+
+def print_cleaner_report(report: Dict) -> None:
+    print(
+        f"{'fixture':<28}{'chars':>10}{'legacy (ms)':>14}{'new (ms)':>12}"
+        f"{'speedup':>10}  output"
+    )
+    for result in report["fixtures"]:
+        if not result["identical"]:
+            output = "DIFFERS"
+        elif not result["incremental_identical"]:
+            output = "DIFFERS when fed by page"
+        else:
+            output = "identical"
+        speedup = result["legacy_seconds"] / max(result["seconds"], 1e-9)
+        print(
+            f"{result['fixture']:<28}{result['chars']:>10}"
+            f"{result['legacy_seconds'] * 1000:>14.2f}"
+            f"{result['seconds'] * 1000:>12.2f}{speedup:>9.2f}x  {output}"
+        )
@@ -0,0 +1,210 @@
+"""
+Recorded fixtures and the OCR / LLM stand-ins replaying them.
+
+A fixture is a directory holding the statement PDF and the responses the
+pipeline received for it:
+
+    <fixtures_dir>/<name>/statement.pdf
+    <fixtures_dir>/<name>/ocr.json          AnalyzeResult.as_dict()
+    <fixtures_dir>/<name>/completion.json   the parsed LLM completion
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Type
+
+from azure.ai.documentintelligence.models import AnalyzeResult
+from openai.types.chat import ChatCompletion, ParsedChatCompletion
+from pydantic import BaseModel
+
+from app.config import app_config
+from app.services.statement_extractor import FinancialStatementProcessor
+
+STATEMENT_FILE = "statement.pdf"
+OCR_FILE = "ocr.json"
+COMPLETION_FILE = "completion.json"
+
+# Size of the content pieces of a replayed streamed completion
+STREAM_CHUNK_CHARS = 16
+
+
+@dataclass
+class Fixture:
+    name: str
+    pdf_bytes: bytes
+    ocr_payload: str
+    completion_payload: str
+
+
+def load_fixtures(fixtures_dir: str) -> List[Fixture]:
+    """
+    Load every complete fixture found in fixtures_dir, sorted by name.
+    """
+    fixtures = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        fixture_dir = os.path.join(fixtures_dir, name)
+        paths = [
+            os.path.join(fixture_dir, file_name)
+            for file_name in (STATEMENT_FILE, OCR_FILE, COMPLETION_FILE)
+        ]
+        if not all(os.path.isfile(path) for path in paths):
+            continue
+        with open(paths[0], "rb") as f:
+            pdf_bytes = f.read()
+        with open(paths[1], encoding="utf-8") as f:
+            ocr_payload = f.read()
+        with open(paths[2], encoding="utf-8") as f:
+            completion_payload = f.read()
+        fixtures.append(Fixture(name, pdf_bytes, ocr_payload, completion_payload))
+    return fixtures
+
+
+class ReplayOcrFactory:
+    """
+    Stands in for OcrFactory, returning the recorded analysis after an
+    optional simulated service latency. The payload is deserialized on every
+    call, like the SDK does with the service response.
+    """
+
+    provider = "replay"
+
+    def __init__(self, payload: str, latency: float = 0.0):
+        self.payload = payload
+        self.latency = latency
+
+    async def get_document_analysis(self, pdf_bytes: bytes) -> AnalyzeResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return AnalyzeResult(json.loads(self.payload))
+
+    async def get_document_analysis_chunked(
+        self, pdf_bytes: bytes, *args, **kwargs
+    ) -> AnalyzeResult:
+        return await self.get_document_analysis(pdf_bytes)
+
+
+class ReplayLlmFactory:
+    """
+    Stands in for LlmFactory, returning the recorded completion after an
+    optional simulated service latency.
+    """
+
+    provider = "replay"
+
+    def __init__(self, payload: str, latency: float = 0.0):
+        self.payload = payload
+        self.latency = latency
+
+    async def create_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        response_format: Type[BaseModel] | None = None,
+        **kwargs,
+    ) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if response_format:
+            return ParsedChatCompletion[response_format].model_validate_json(
+                self.payload
+            )
+        return ChatCompletion.model_validate_json(self.payload)
+
+    async def stream_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        response_format: Type[BaseModel],
+        on_delta: Callable[[str], Awaitable[None]],
+        **kwargs,
+    ) -> Any:
+        """
+        Hand out the recorded content in STREAM_CHUNK_CHARS pieces, spread
+        over the simulated latency.
+        """
+        completion = ParsedChatCompletion[response_format].model_validate_json(
+            self.payload
+        )
+        content = completion.choices[0].message.content
+        chunks = [
+            content[start : start + STREAM_CHUNK_CHARS]
+            for start in range(0, len(content), STREAM_CHUNK_CHARS)
+        ]
+        for chunk in chunks:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(chunks))
+            await on_delta(chunk)
+        return completion
+
+
+def replay_processor(
+    fixture: Fixture, ocr_latency: float = 0.0, llm_latency: float = 0.0
+) -> FinancialStatementProcessor:
+    return FinancialStatementProcessor(
+        ocr_factory=ReplayOcrFactory(fixture.ocr_payload, ocr_latency),
+        llm_factory=ReplayLlmFactory(fixture.completion_payload, llm_latency),
+    )
+
+
+class _RecordingOcrFactory:
+    def __init__(self, factory):
+        self.factory = factory
+        self.provider = factory.provider
+        self.result = None
+
+    async def get_document_analysis(self, pdf_bytes: bytes) -> AnalyzeResult:
+        self.result = await self.factory.get_document_analysis(pdf_bytes)
+        return self.result
+
+    async def get_document_analysis_chunked(
+        self, pdf_bytes: bytes, *args, **kwargs
+    ) -> AnalyzeResult:
+        self.result = await self.factory.get_document_analysis_chunked(
+            pdf_bytes, *args, **kwargs
+        )
+        return self.result
+
+
+class _RecordingLlmFactory:
+    def __init__(self, factory):
+        self.factory = factory
+        self.provider = factory.provider
+        self.completion = None
+
+    async def create_completion(self, *args, **kwargs) -> Any:
+        kwargs["use_cache"] = False
+        self.completion = await self.factory.create_completion(*args, **kwargs)
+        return self.completion
+
+
+async def record_fixture(pdf_path: str, fixtures_dir: str, name: str) -> str:
+    """
+    Run a statement through the real OCR and LLM services and store the
+    responses as a fixture. Requires the Azure credentials.
+
+    Returns:
+        str: The fixture directory
+    """
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+
+    # Go to the services, a cached analysis would not be recorded
+    app_config.OCR_CACHE_ENABLED = False
+    processor = FinancialStatementProcessor()
+    ocr_factory = _RecordingOcrFactory(processor.ocr_factory)
+    llm_factory = _RecordingLlmFactory(processor.llm_factory)
+    processor.ocr_factory = ocr_factory
+    processor.llm_factory = llm_factory
+    await processor.process_scan(pdf_bytes)
+
+    fixture_dir = os.path.join(fixtures_dir, name)
+    os.makedirs(fixture_dir, exist_ok=True)
+    with open(os.path.join(fixture_dir, STATEMENT_FILE), "wb") as f:
+        f.write(pdf_bytes)
+    with open(os.path.join(fixture_dir, OCR_FILE), "w", encoding="utf-8") as f:
+        json.dump(ocr_factory.result.as_dict(), f)
+    with open(os.path.join(fixture_dir, COMPLETION_FILE), "w", encoding="utf-8") as f:
+        f.write(llm_factory.completion.model_dump_json())
+    return fixture_dir
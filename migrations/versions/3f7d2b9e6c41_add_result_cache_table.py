@@ -0,0 +1,49 @@
+"""add_result_cache_table
+
+Revision ID: 3f7d2b9e6c41
+Revises: 9c1e4f27a8b3
+Create Date: 2025-01-14 14:03:51.207615
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f7d2b9e6c41"
+down_revision: Union[str, None] = "9c1e4f27a8b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "result_cache",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("namespace", sa.String(length=100), nullable=False),
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.Column("last_accessed_at", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_result_cache_namespace_key",
+        "result_cache",
+        ["namespace", "key"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_result_cache_last_accessed_at", "result_cache", ["last_accessed_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_result_cache_last_accessed_at", "result_cache")
+    op.drop_index("ix_result_cache_namespace_key", "result_cache")
+    op.drop_table("result_cache")
@@ -0,0 +1,46 @@
+"""add_scan_job_lease_columns
+
+Revision ID: 9c1e4f27a8b3
+Revises: 45bf663c0530
+Create Date: 2025-01-13 09:12:44.518203
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c1e4f27a8b3"
+down_revision: Union[str, None] = "45bf663c0530"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "scans",
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "scans", sa.Column("worker_id", sa.String(length=100), nullable=True)
+    )
+    op.add_column("scans", sa.Column("heartbeat_at", sa.BigInteger(), nullable=True))
+    op.add_column(
+        "scans", sa.Column("lease_expires_at", sa.BigInteger(), nullable=True)
+    )
+    op.create_index(
+        "ix_scans_status_lease_expires_at",
+        "scans",
+        ["status", "lease_expires_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scans_status_lease_expires_at", "scans")
+    op.drop_column("scans", "lease_expires_at")
+    op.drop_column("scans", "heartbeat_at")
+    op.drop_column("scans", "worker_id")
+    op.drop_column("scans", "attempts")
@@ -0,0 +1,30 @@
+"""add_scan_list_keyset_index
+
+Revision ID: b7e3a1d92f04
+Revises: 3f7d2b9e6c41
+Create Date: 2025-01-20 10:04:17.392811
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e3a1d92f04"
+down_revision: Union[str, None] = "3f7d2b9e6c41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_scans_prospect_id_created_at_id",
+        "scans",
+        ["prospect_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scans_prospect_id_created_at_id", "scans")
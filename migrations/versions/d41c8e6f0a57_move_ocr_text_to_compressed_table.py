@@ -0,0 +1,115 @@
+"""move_ocr_text_to_compressed_table
+
+Revision ID: d41c8e6f0a57
+Revises: b7e3a1d92f04
+Create Date: 2025-01-21 15:26:08.114937
+
+"""
+
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d41c8e6f0a57"
+down_revision: Union[str, None] = "b7e3a1d92f04"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+def _compress(text):
+    return zlib.compress(text.encode("utf-8")) if text is not None else None
+
+
+def _decompress(payload):
+    return zlib.decompress(payload).decode("utf-8") if payload is not None else None
+
+
+def _size(*texts):
+    return sum(len(text.encode("utf-8")) for text in texts if text is not None)
+
+
+def upgrade() -> None:
+    ocr_texts = op.create_table(
+        "ocr_texts",
+        sa.Column("scan_id", sa.Integer(), nullable=False),
+        sa.Column("ocr_text", sa.LargeBinary(), nullable=True),
+        sa.Column("ocr_text_cleaned", sa.LargeBinary(), nullable=True),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["scan_id"], ["scans.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("scan_id"),
+    )
+
+    # Compress the existing texts in batches, keyset on the scan id
+    connection = op.get_bind()
+    last_scan_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(
+                "SELECT scan_id, ocr_text, ocr_text_cleaned, created_at "
+                "FROM ocr_results WHERE scan_id > :last_scan_id "
+                "AND (ocr_text IS NOT NULL OR ocr_text_cleaned IS NOT NULL) "
+                "ORDER BY scan_id LIMIT :limit"
+            ),
+            {"last_scan_id": last_scan_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        op.bulk_insert(
+            ocr_texts,
+            [
+                {
+                    "scan_id": row.scan_id,
+                    "ocr_text": _compress(row.ocr_text),
+                    "ocr_text_cleaned": _compress(row.ocr_text_cleaned),
+                    "size_bytes": _size(row.ocr_text, row.ocr_text_cleaned),
+                    "created_at": row.created_at,
+                }
+                for row in rows
+            ],
+        )
+        last_scan_id = rows[-1].scan_id
+
+    op.drop_column("ocr_results", "ocr_text_cleaned")
+    op.drop_column("ocr_results", "ocr_text")
+
+
+def downgrade() -> None:
+    op.add_column("ocr_results", sa.Column("ocr_text", sa.Text(), nullable=True))
+    op.add_column(
+        "ocr_results", sa.Column("ocr_text_cleaned", sa.Text(), nullable=True)
+    )
+
+    connection = op.get_bind()
+    last_scan_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(
+                "SELECT scan_id, ocr_text, ocr_text_cleaned FROM ocr_texts "
+                "WHERE scan_id > :last_scan_id ORDER BY scan_id LIMIT :limit"
+            ),
+            {"last_scan_id": last_scan_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            connection.execute(
+                sa.text(
+                    "UPDATE ocr_results SET ocr_text = :ocr_text, "
+                    "ocr_text_cleaned = :ocr_text_cleaned WHERE scan_id = :scan_id"
+                ),
+                {
+                    "scan_id": row.scan_id,
+                    "ocr_text": _decompress(row.ocr_text),
+                    "ocr_text_cleaned": _decompress(row.ocr_text_cleaned),
+                },
+            )
+        last_scan_id = rows[-1].scan_id
+
+    op.drop_table("ocr_texts")
@@ -0,0 +1,75 @@
+"""add_scan_aggregate_columns
+
+Revision ID: e5a90b3c7d12
+Revises: d41c8e6f0a57
+Create Date: 2025-01-23 11:47:32.650184
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a90b3c7d12"
+down_revision: Union[str, None] = "d41c8e6f0a57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "scans",
+        sa.Column("total_value", sa.Float(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "scans",
+        sa.Column("institutions", sa.Text(), server_default="", nullable=False),
+    )
+    op.add_column(
+        "scans",
+        sa.Column("account_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "scans",
+        sa.Column("holding_count", sa.Integer(), server_default="0", nullable=False),
+    )
+
+    # Backfill from the existing accounts and holdings
+    op.execute(
+        """
+        UPDATE scans SET
+            total_value = account_totals.total_value,
+            institutions = account_totals.institutions,
+            account_count = account_totals.account_count,
+            holding_count = COALESCE(holding_totals.holding_count, 0)
+        FROM (
+            SELECT
+                scan_id,
+                COALESCE(SUM(account_value), 0) AS total_value,
+                COALESCE(
+                    string_agg(DISTINCT NULLIF(institution, ''), ', '
+                               ORDER BY NULLIF(institution, '')),
+                    ''
+                ) AS institutions,
+                COUNT(*) AS account_count
+            FROM accounts
+            GROUP BY scan_id
+        ) AS account_totals
+        LEFT JOIN (
+            SELECT accounts.scan_id, COUNT(*) AS holding_count
+            FROM holdings JOIN accounts ON holdings.account_id = accounts.id
+            GROUP BY accounts.scan_id
+        ) AS holding_totals ON holding_totals.scan_id = account_totals.scan_id
+        WHERE scans.id = account_totals.scan_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("scans", "holding_count")
+    op.drop_column("scans", "account_count")
+    op.drop_column("scans", "institutions")
+    op.drop_column("scans", "total_value")
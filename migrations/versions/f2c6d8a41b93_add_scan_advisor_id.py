@@ -0,0 +1,54 @@
+"""add_scan_advisor_id
+
+Revision ID: f2c6d8a41b93
+Revises: e5a90b3c7d12
+Create Date: 2025-01-27 09:18:45.207316
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c6d8a41b93"
+down_revision: Union[str, None] = "e5a90b3c7d12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("scans", sa.Column("advisor_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "scans_advisor_id_fkey", "scans", "advisors", ["advisor_id"], ["id"]
+    )
+    op.execute(
+        """
+        UPDATE scans
+        SET advisor_id = prospects.advisor_id
+        FROM prospects
+        WHERE prospects.id = scans.prospect_id
+        """
+    )
+
+    # The scan list of an advisor spans all of their prospects, so the index
+    # has to lead with the advisor to give the (created_at, id) order
+    op.create_index(
+        "ix_scans_advisor_id_created_at_id",
+        "scans",
+        ["advisor_id", "created_at", "id"],
+    )
+    op.drop_index("ix_scans_prospect_id_created_at_id", "scans")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_scans_prospect_id_created_at_id",
+        "scans",
+        ["prospect_id", "created_at", "id"],
+    )
+    op.drop_index("ix_scans_advisor_id_created_at_id", "scans")
+    op.drop_constraint("scans_advisor_id_fkey", "scans", type_="foreignkey")
+    op.drop_column("scans", "advisor_id")
@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.services.llm_resilience import CircuitOpenError, ResilientLlmCaller
+
+
+def _status_error(error_class, status_code: int) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://llm.invalid/v1/chat/completions")
+    response = httpx.Response(status_code, request=request)
+    return error_class("failed", response=response, body=None)
+
+
+def _caller() -> ResilientLlmCaller:
+    return ResilientLlmCaller(
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        timeout_seconds=1,
+        max_attempts=1,
+        backoff_max_seconds=0,
+        failure_threshold=2,
+        reset_seconds=0.01,
+    )
+
+
+def _failing(error: Exception):
+    async def request():
+        raise error
+
+    return request
+
+
+async def _succeeding():
+    return "ok"
+
+
+def test_rate_limited_trial_lets_the_next_call_try():
+    async def scenario():
+        caller = _caller()
+        for _ in range(2):
+            with pytest.raises(openai.InternalServerError):
+                await caller.call(
+                    _failing(_status_error(openai.InternalServerError, 500)), 1
+                )
+        assert caller.breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await caller.call(_succeeding, 1)
+
+        await asyncio.sleep(0.02)
+        assert caller.breaker.state == "half_open"
+        with pytest.raises(openai.RateLimitError):
+            await caller.call(_failing(_status_error(openai.RateLimitError, 429)), 1)
+
+        # The 429 ended the trial without reopening or wedging the circuit
+        assert caller.breaker.state == "half_open"
+        assert await caller.call(_succeeding, 1) == "ok"
+        assert caller.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_reopens_the_circuit():
+    async def scenario():
+        caller = _caller()
+        for _ in range(2):
+            with pytest.raises(openai.InternalServerError):
+                await caller.call(
+                    _failing(_status_error(openai.InternalServerError, 500)), 1
+                )
+        await asyncio.sleep(0.02)
+        with pytest.raises(openai.InternalServerError):
+            await caller.call(
+                _failing(_status_error(openai.InternalServerError, 500)), 1
+            )
+        assert caller.breaker.state == "open"
+
+    asyncio.run(scenario())